@@ -2,3 +2,4 @@
 # Project Part B: Game Playing Agent
 
 from .program import Agent
+from .mcts import MCTSAgent
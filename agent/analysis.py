@@ -0,0 +1,177 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+# Offline analysis and self-play with a lazy-SMP search: every worker process
+# runs the agent's iterative deepening on the same position, sharing one
+# transposition table in shared memory, and the deepest completed result wins.
+# This is for our own tooling only; under the referee the agent stays a single
+# process (the referee only accounts for the CPU time of that process).
+#
+#   python -m agent.analysis analyse --seconds 10 --workers 32
+#   python -m agent.analysis analyse --position "*RRRRRR*/1******1/8/8/8/8/1******1/*BBBBBB* r 0"
+#   python -m agent.analysis selfplay --games 4 --seconds 2 --workers 32
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from referee.game import PlayerColor, Action
+from .program import Agent, GameState, TranspositionTable
+
+# Packed entry layout (one int64): value + bias in bits 0-31, bound in 32-33,
+# depth in 34-41, generation in 42-49 and best move key + 1 (0 = none) in 50-62
+_VALUE_BIAS = 1 << 31
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table in a shared memory block, so several processes can
+    search into the same table. Each slot is two int64s: the key XOR the packed
+    entry, and the packed entry; a torn write fails the key check on probe.
+    Generations are set by the owner (see Analyser), not by each search.
+    """
+    def __init__(self, size_bits: int = 20, name: str | None = None):
+        self.size_bits = size_bits
+        self.generation = 0
+        self._mask = (1 << size_bits) - 1
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=(4 << size_bits) * 8)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._table = self._shm.buf.cast("q")
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def clear(self):
+        # Zero every slot in place
+        self._shm.buf[:len(self._table) * 8] = bytes(len(self._table) * 8)
+
+    def resize(self, size_bits: int):
+        # Shared tables keep the size they were created with
+        if size_bits != self.size_bits:
+            raise ValueError(f"shared table has a fixed size of 2^{self.size_bits} buckets")
+
+    def new_search(self):
+        pass
+
+    def probe(self, key: int):
+        # Return the (depth, flag, value, move, generation) entry stored for key, if any
+        table = self._table
+        slot = (key & self._mask) << 2
+        for i in (slot, slot + 2):
+            data = table[i + 1]
+            if data and table[i] ^ data == key:
+                move = data >> 50
+                return ((data >> 34) & 0xFF, (data >> 32) & 3, (data & 0xFFFFFFFF) - _VALUE_BIAS,
+                        move - 1 if move else None, (data >> 42) & 0xFF)
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: int, move: int | None):
+        # Same replacement policy as TranspositionTable, on packed slots
+        table = self._table
+        generation = self.generation & 0xFF
+        data = ((value + _VALUE_BIAS) | flag << 32 | min(depth, 0xFF) << 34 | generation << 42
+                | (0 if move is None else move + 1) << 50)
+        slot = (key & self._mask) << 2
+        old = table[slot + 1]
+        if not old or table[slot] ^ old == key or depth >= (old >> 34) & 0xFF \
+                or (old >> 42) & 0xFF != generation:
+            table[slot], table[slot + 1] = key ^ data, data
+        else:
+            table[slot + 2], table[slot + 3] = key ^ data, data
+
+    def close(self):
+        # Detach from the shared block (the creator should also call unlink)
+        self._table.release()
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+# Per-process agent searching into the shared table, set up once by the pool initialiser
+_worker_agent: Agent | None = None
+
+
+def _attach(name: str, size_bits: int):
+    global _worker_agent
+    _worker_agent = Agent(PlayerColor.RED, tt=SharedTranspositionTable(size_bits, name))
+
+
+def _smp_search(position: tuple, generation: int, seconds: float, start_depth: int) -> tuple[int, int, Action]:
+    # One lazy-SMP worker: iterative deepening on the position, into the shared table
+    pads, red, blue, player, turn = position
+    agent = _worker_agent
+    agent.state = GameState.from_masks(pads, red, blue, PlayerColor(player), turn)
+    agent.color = agent.state.current_player
+    agent.enemy = agent.color.opponent
+    agent.tt.generation = generation
+    return agent.search(seconds, start_depth)
+
+
+class Analyser:
+    """
+    A pool of search processes sharing one transposition table. Use as a
+    context manager so the pool and the shared memory are released.
+    """
+    def __init__(self, workers: int | None = None, size_bits: int = 20):
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(size_bits)
+        self._pool = ProcessPoolExecutor(
+            self.workers, initializer=_attach, initargs=(self.table.name, size_bits))
+
+    def __enter__(self) -> 'Analyser':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._pool.shutdown()
+        self.table.close()
+        self.table.unlink()
+
+    def search(self, state: GameState, seconds: float) -> tuple[int, int, Action]:
+        # Search state on every worker for about `seconds` of CPU time each;
+        # half of them skip depth 1 so the workers spread over two depths
+        self.table.generation += 1
+        position = (state.pads, state.red, state.blue, state.current_player.value, state.turn)
+        futures = [
+            self._pool.submit(_smp_search, position, self.table.generation, seconds, 1 + i % 2)
+            for i in range(self.workers)
+        ]
+        results = [future.result() for future in futures]
+        return max(results, key=lambda result: result[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="agent.analysis",
+        description="Lazy-SMP position analysis and self-play for the Freckers agent.")
+    parser.add_argument("mode", choices=["analyse", "selfplay"])
+    parser.add_argument("--seconds", type=float, default=5.0, help="CPU seconds per worker per move")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--games", type=int, default=1, help="self-play games to generate")
+    parser.add_argument("--position", default=None, help="position to analyse, in text notation")
+    parser.add_argument("--table-bits", type=int, default=20, help="log2 of shared table buckets")
+    args = parser.parse_args()
+
+    with Analyser(args.workers, args.table_bits) as analyser:
+        if args.mode == "analyse":
+            state = GameState.from_notation(args.position) if args.position else GameState()
+            depth, value, act = analyser.search(state, args.seconds)
+            print(f"depth {depth}  score {value}  {act}")
+            return
+
+        for game in range(args.games):
+            state = GameState()
+            while not state.is_terminal():
+                depth, value, act = analyser.search(state, args.seconds)
+                print(f"game {game}  turn {state.turn + 1}  {state.current_player}  "
+                      f"depth {depth}  score {value}  {act}", flush=True)
+                state.apply_action(act)
+            print(f"game {game}  winner {state.get_winner()}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+# Offline opening-book builder. For each colour in turn, walks the opening
+# from the initial position: where that colour is to move it searches for the
+# best move and follows only that move; where the opponent is to move it
+# follows every legal reply. Positions are keyed by GameState.canonical_key(),
+# so a position and its mirror image share one (searched once) entry, and
+# written as an OpeningBook file, which the agent maps at construction.
+#
+#   python -m agent.book --plies 4 --seconds 6
+
+import argparse
+import os
+
+from referee.game import PlayerColor
+from .program import Agent, GameState, OpeningBook, BOOK_PATH, mirror_move
+
+
+def build(plies: int, seconds: float, verbose: bool = True) -> dict[int, int]:
+    # Book moves (position key -> move key) for both colours over the first
+    # `plies` turns, each searched for `seconds` of CPU time
+    book: dict[int, int] = {}
+    for color in (PlayerColor.RED, PlayerColor.BLUE):
+        _expand(GameState(), Agent(color), plies, seconds, book, set(), verbose)
+    return book
+
+
+def _expand(state: GameState, agent: Agent, plies: int, seconds: float,
+            book: dict[int, int], seen: set[int], verbose: bool):
+    key, mirrored = state.canonical_key()
+    if state.turn >= plies or state.is_terminal() or key in seen:
+        return
+    seen.add(key)
+
+    if state.current_player == agent.color:
+        agent.state = state.clone()
+        depth, value, best = agent.search(seconds)
+        move = state.action_key(best)
+        book[key] = mirror_move(move) if mirrored else move
+        if verbose:
+            print(f"turn {state.turn} {agent.color}: {best} (depth {depth}, score {value}) [{len(book)}]")
+        actions = [best]
+    else:
+        actions = state.get_legal_actions()
+
+    for act in actions:
+        undo = state.apply_action(act)
+        _expand(state, agent, plies, seconds, book, seen, verbose)
+        state.undo_action(undo)
+
+
+def write(book: dict[int, int], path: str):
+    # Write the book as sorted fixed-size records, replacing path atomically
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        for key in sorted(book):
+            f.write(OpeningBook.RECORD.pack(key, book[key]))
+    os.replace(partial, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="agent.book",
+        description="Build the opening book for the Freckers agent.")
+    parser.add_argument("--plies", type=int, default=4, help="turns from the start covered by the book")
+    parser.add_argument("--seconds", type=float, default=6.0, help="CPU seconds of search per book move")
+    parser.add_argument("--out", default=BOOK_PATH, help="book file to write")
+    args = parser.parse_args()
+
+    book = build(args.plies, args.seconds)
+    write(book, args.out)
+    print(f"wrote {len(book)} positions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+from __future__ import annotations
+import math
+import time
+from typing import List
+
+from referee.game import PlayerColor, Action
+from .program import BaseAgent, GameState, _DIRS, _RED_DIR_IDX, _BLUE_DIR_IDX, _SHIFT, _SHIFT_SOURCES, _ROW_MASKS
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only MCTSAgent needs it
+    np = None
+
+
+class MCTSAgent(BaseAgent):
+    """
+    Freckers agent using Monte Carlo tree search (UCT) over GameState, with
+    playouts run in NumPy batches. Select it with `agent:MCTSAgent`.
+    """
+    def __init__(self, color: PlayerColor, **referee):
+        if np is None:
+            raise ImportError("MCTSAgent requires numpy")
+        super().__init__(color, **referee)
+        self.playouts_per_leaf = 32
+        self.leaves_per_batch = 16
+        self.exploration = 0.7
+        self.tree = MCTSTree(Playouts(self.playouts_per_leaf))
+
+    def action(self, **referee) -> Action:
+        self.state.current_player = self.color
+        budget = self._time_budget(referee.get("time_remaining"))
+        return self.tree.search(self.state, budget, self.exploration, self.leaves_per_batch)
+
+    def update(self, color_of_player_who_acted: PlayerColor, action_performed: Action, **referee):
+        self.state.current_player = color_of_player_who_acted
+        self.tree.advance(self.state.action_key(action_performed))
+        super().update(color_of_player_who_acted, action_performed, **referee)
+
+
+class _Node:
+    """
+    A search tree node. `reward` is summed from the point of view of the player
+    who made `move` (the player to move at the parent). `untried` holds the
+    unexpanded moves in reverse move order, so the next one pops off the end.
+    """
+    __slots__ = ("move", "children", "untried", "visits", "reward")
+
+    def __init__(self, move: int | None):
+        self.move = move
+        self.children: dict[int, _Node] = {}
+        self.untried: List[int] | None = None
+        self.visits = 0
+        self.reward = 0.0
+
+
+class MCTSTree:
+    """
+    UCT tree kept between turns: advance() re-roots it under the move actually
+    played, so the subtree already searched for that move is reused.
+    """
+    def __init__(self, playouts: Playouts):
+        self.playouts = playouts
+        self.root = _Node(None)
+
+    def advance(self, move: int):
+        # Re-root under move, or start afresh if it was never expanded
+        self.root = self.root.children.get(move) or _Node(move)
+
+    def search(self, state: GameState, budget: float, exploration: float, batch: int) -> Action:
+        # Run UCT for `budget` seconds of CPU time on a copy of state, selecting
+        # `batch` leaves at a time and playing them out together; returns the
+        # most visited root action
+        deadline = time.process_time() + budget
+        state = state.clone()
+        root = self.root
+        if root.untried is None:
+            root.untried = list(state.iter_moves())[::-1]
+
+        while not root.children or time.process_time() < deadline:
+            leaves, paths = [], []
+            for _ in range(batch):
+                path, undos = self._descend(state, exploration)
+                leaves.append(state.clone())
+                paths.append(path)
+                for undo in reversed(undos):
+                    state.undo_action(undo)
+
+            # Backpropagation: visits were counted on the way down (a virtual
+            # loss, so the rest of the batch spreads out); add the rewards now
+            count = self.playouts.count
+            for path, red_score in zip(paths, self.playouts.run(leaves)):
+                mover = state.current_player.opponent
+                for visited in path:
+                    visited.reward += red_score if mover == PlayerColor.RED else count - red_score
+                    mover = mover.opponent
+
+        best = max(root.children.values(), key=lambda child: child.visits)
+        return state.action_for_key(best.move)
+
+    def _descend(self, state: GameState, exploration: float) -> tuple[List[_Node], list]:
+        # Select down the tree and expand one child, applying moves to state;
+        # returns the path from the root and the undo records
+        count = self.playouts.count
+        node = self.root
+        node.visits += count
+        path, undos = [node], []
+        while not node.untried and node.children and not state.is_terminal():
+            node = self._select(node, exploration)
+            undos.append(state.apply_move(node.move))
+            node.visits += count
+            path.append(node)
+
+        if node.untried and not state.is_terminal():
+            move = node.untried.pop()
+            child = _Node(move)
+            node.children[move] = child
+            undos.append(state.apply_move(move))
+            child.untried = list(state.iter_moves())[::-1] if not state.is_terminal() else []
+            child.visits += count
+            path.append(child)
+        return path, undos
+
+    def _select(self, node: _Node, exploration: float) -> _Node:
+        # UCT: mean reward plus an exploration bonus for rarely visited children
+        log_visits = math.log(node.visits)
+        return max(
+            node.children.values(),
+            key=lambda child: child.reward / child.visits + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class Playouts:
+    """
+    Vectorised playouts: `count` copies of a position are played out together
+    as arrays of pad / red / blue masks. Each ply, every board picks a single
+    step, single-hop jump or GROW for the side to move: first a move class
+    (kind and direction) with probability proportional to its number of
+    sources times its weight, then a source square uniformly within it. Boards
+    still undecided after `max_plies` are scored by goal-row count, then row
+    distance.
+    """
+    STEP, LATERAL, JUMP, LATERAL_JUMP, GROW = 4.0, 1.0, 8.0, 2.0, 1.5
+
+    def __init__(self, count: int, max_plies: int = 60, seed: int | None = None):
+        self.count = count
+        self.max_plies = max_plies
+        self.rng = np.random.default_rng(seed)
+        u64 = np.uint64
+        self._bit_shifts = np.arange(64, dtype=u64)
+        self._row_index = np.arange(64) // 8
+        self._goal = {PlayerColor.RED: u64(_ROW_MASKS[7]), PlayerColor.BLUE: u64(_ROW_MASKS[0])}
+        self._sources = [u64(mask) for mask in _SHIFT_SOURCES]
+        self._shifts = [u64(abs(shift)) for shift in _SHIFT]
+        self._reverse = [_DIRS.index(-d) for d in _DIRS]
+
+        # Move class k: steps in direction slot k for k < 5, single hops in
+        # slot k - 5 for k < 10, then GROW; per player, the weight and the
+        # square offset of each class
+        self._dirs = {PlayerColor.RED: _RED_DIR_IDX, PlayerColor.BLUE: _BLUE_DIR_IDX}
+        self._weights, self._offsets = {}, {}
+        for player, dirs in self._dirs.items():
+            forward = [_DIRS[d].r != 0 for d in dirs]
+            self._weights[player] = np.array(
+                [self.STEP if f else self.LATERAL for f in forward]
+                + [self.JUMP if f else self.LATERAL_JUMP for f in forward])
+            self._offsets[player] = np.array([_SHIFT[d] for d in dirs] + [2 * _SHIFT[d] for d in dirs])
+
+    def _shift(self, masks, d: int, back: bool = False):
+        # Step every square of each mask one square in direction d (or against it)
+        if back:
+            d = self._reverse[d]
+        masks = masks & self._sources[d]
+        return masks << self._shifts[d] if _SHIFT[d] > 0 else masks >> self._shifts[d]
+
+    def _bits(self, masks):
+        # (boards, 64) boolean array of the squares set in each mask
+        return ((masks[:, None] >> self._bit_shifts) & np.uint64(1)).astype(bool)
+
+    def _popcount(self, masks):
+        # Elementwise population count (SWAR, for numpy versions without bitwise_count)
+        u64 = np.uint64
+        masks = masks - ((masks >> u64(1)) & u64(0x5555555555555555))
+        masks = (masks & u64(0x3333333333333333)) + ((masks >> u64(2)) & u64(0x3333333333333333))
+        masks = (masks + (masks >> u64(4))) & u64(0x0F0F0F0F0F0F0F0F)
+        return (masks * u64(0x0101010101010101)) >> u64(56)
+
+    def _candidates(self, own, occupied, free, dirs):
+        # (boards, 10) source masks of the step and single-hop move classes
+        steps, hops = [], []
+        for d in dirs:
+            step = self._shift(own, d) & free
+            hop = self._shift(self._shift(own, d) & occupied, d) & free
+            steps.append(self._shift(step, d, back=True))
+            hops.append(self._shift(self._shift(hop, d, back=True), d, back=True))
+        return np.stack(steps + hops, axis=1)
+
+    def run(self, states: List[GameState]) -> List[float]:
+        # Play `count` games out from each state; returns red's total score for
+        # each (win 1, draw 0.5). Boards are batched per side to move.
+        scores = [0.0] * len(states)
+        for player in (PlayerColor.RED, PlayerColor.BLUE):
+            group = [i for i, state in enumerate(states) if state.current_player == player]
+            if group:
+                totals = self._play([states[i] for i in group], player)
+                for i, total in zip(group, totals):
+                    scores[i] = float(total)
+        return scores
+
+    def _play(self, states: List[GameState], player: PlayerColor):
+        # Playouts for states that all have `player` to move
+        u64 = np.uint64
+        n = len(states) * self.count
+        boards = np.arange(n)
+        pads = np.repeat(np.array([state.pads for state in states], dtype=u64), self.count)
+        frogs = {PlayerColor.RED: np.repeat(np.array([state.red for state in states], dtype=u64), self.count),
+                 PlayerColor.BLUE: np.repeat(np.array([state.blue for state in states], dtype=u64), self.count)}
+        turn = np.repeat(np.array([state.turn for state in states]), self.count)
+        result = np.full(n, -1.0)  # red's score once decided
+
+        for _ in range(self.max_plies):
+            red_goal = self._popcount(frogs[PlayerColor.RED] & self._goal[PlayerColor.RED]).astype(np.int64)
+            blue_goal = self._popcount(frogs[PlayerColor.BLUE] & self._goal[PlayerColor.BLUE]).astype(np.int64)
+            undecided = result < 0
+            result[undecided & (red_goal == 6)] = 1.0
+            result[undecided & (blue_goal == 6)] = 0.0
+            limit = (result < 0) & (turn >= GameState.MAX_TURNS)
+            result[limit] = np.sign(red_goal - blue_goal)[limit] * 0.5 + 0.5
+            if not (result < 0).any():
+                break
+
+            own = frogs[player]
+            occupied = frogs[PlayerColor.RED] | frogs[PlayerColor.BLUE]
+            sources = self._candidates(own, occupied, pads & ~occupied, self._dirs[player])
+
+            # Pick a move class per board, then a source square within it
+            weights = self._popcount(sources) * self._weights[player]
+            totals = np.cumsum(weights, axis=1)
+            draw = self.rng.random(n) * (totals[:, -1] + self.GROW)
+            move_class = (totals <= draw[:, None]).sum(axis=1)
+            moving = move_class < 10
+            move_class = np.minimum(move_class, 9)
+            chosen = self._bits(sources[boards, move_class]) * self.rng.random((n, 64))
+            source = chosen.argmax(axis=1)
+            target = source + self._offsets[player][move_class]
+            moved = (u64(1) << source.astype(u64)) | (u64(1) << target.astype(u64))
+            own = np.where(moving, own ^ moved, own)
+            pads = np.where(moving, pads & ~(u64(1) << source.astype(u64)), pads)
+
+            reach = np.zeros(n, dtype=u64)
+            for d in range(8):
+                reach |= self._shift(frogs[player], d)
+            pads = np.where(moving, pads, pads | (reach & ~occupied))
+
+            frogs[player] = own
+            player = player.opponent
+            turn += 1
+
+        # Boards still undecided: more frogs home wins, then fewer rows to go
+        undecided = result < 0
+        if undecided.any():
+            red, blue = frogs[PlayerColor.RED], frogs[PlayerColor.BLUE]
+            margin = (self._popcount(red & self._goal[PlayerColor.RED]).astype(np.int64)
+                      - self._popcount(blue & self._goal[PlayerColor.BLUE]).astype(np.int64)) * 64
+            margin += (self._bits(blue) * self._row_index).sum(axis=1) \
+                - (self._bits(red) * (7 - self._row_index)).sum(axis=1)
+            result[undecided] = (np.sign(margin) * 0.5 + 0.5)[undecided]
+        return result.reshape(len(states), self.count).sum(axis=1)
@@ -0,0 +1,221 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+# Perft: count the positions reachable in exactly N turns from a position,
+# with the agent engine and/or the referee's Board, timing each depth. Every
+# generator yields one move per distinct resulting position (jump paths to the
+# same landing square count once), so the counts of a correct engine agree
+# with the referee's. When they disagree, the first position whose successors
+# differ is printed.
+#
+#   python -m agent.perft --depth 3
+#   python -m agent.perft --depth 4 --generator moves --random 5 --plies 20
+#   python -m agent.perft --depth 3 --position "*RRRRRR*/1******1/8/8/8/8/1******1/*BBBBBB* r 0"
+
+import argparse
+import random
+import time
+
+from referee.game import Board
+from .program import GameState
+
+
+class EnginePerft:
+    """
+    Perft over GameState, through the referee-facing get_legal_actions() and
+    apply_action(), or (moves=True) through the search's iter_moves() and
+    apply_move().
+    """
+    def __init__(self, state: GameState, moves: bool = False):
+        self.state = state.clone()
+        self.moves = moves
+
+    def perft(self, depth: int) -> int:
+        state = self.state
+        if depth == 0 or state.is_terminal():
+            return 1
+        if self.moves:
+            children = list(state.iter_moves())
+            apply = state.apply_move
+        else:
+            children = state.get_legal_actions()
+            apply = state.apply_action
+        if depth == 1:
+            return len(children)
+        count = 0
+        for child in children:
+            undo = apply(child)
+            count += self.perft(depth - 1)
+            state.undo_action(undo)
+        return count
+
+    def successors(self) -> dict[tuple[int, int, int], str]:
+        # Resulting (pads, red, blue) masks of every move, with the move that reached them
+        found = {}
+        for act in self.state.get_legal_actions():
+            undo = self.state.apply_action(act)
+            found[_state_masks(self.state)] = str(act)
+            self.state.undo_action(undo)
+        return found
+
+    def play(self, masks: tuple[int, int, int]):
+        # Apply the move reaching masks; returns an undo callable
+        for act in self.state.get_legal_actions():
+            undo = self.state.apply_action(act)
+            if _state_masks(self.state) == masks:
+                return lambda: self.state.undo_action(undo)
+            self.state.undo_action(undo)
+        raise ValueError("no move reaches that position")
+
+
+class BoardPerft:
+    """
+    Perft over the referee's Board, through its own legal_actions(), which
+    follows the referee's rules exactly.
+    """
+    def __init__(self, state: GameState):
+        self.board = Board.from_position((state.pads, state.red, state.blue, state.current_player, state.turn))
+
+    def legal_actions(self) -> list:
+        # One legal action per distinct resulting position, GROW last
+        return self.board.legal_actions()
+
+    def perft(self, depth: int) -> int:
+        board = self.board
+        if depth == 0 or board.game_over:
+            return 1
+        actions = self.legal_actions()
+        if depth == 1:
+            return len(actions)
+        count = 0
+        for act in actions:
+            board.apply_action(act)
+            count += self.perft(depth - 1)
+            board.undo_action()
+        return count
+
+    def successors(self) -> dict[tuple[int, int, int], str]:
+        found = {}
+        for act in self.legal_actions():
+            self.board.apply_action(act)
+            found[_board_masks(self.board)] = str(act)
+            self.board.undo_action()
+        return found
+
+    def play(self, masks: tuple[int, int, int]):
+        for act in self.legal_actions():
+            self.board.apply_action(act)
+            if _board_masks(self.board) == masks:
+                return self.board.undo_action
+            self.board.undo_action()
+        raise ValueError("no move reaches that position")
+
+
+def divergence(state: GameState, depth: int) -> tuple[str, dict, dict] | None:
+    # Walk the engine and the Board in lockstep to the first position (within
+    # depth turns) where their successor positions differ; returns its
+    # rendering with the successors only the engine / only the Board found
+    engine, reference = EnginePerft(state), BoardPerft(state)
+
+    def walk(depth: int):
+        ours, theirs = engine.successors(), reference.successors()
+        if ours.keys() != theirs.keys():
+            return (reference.board.render(),
+                    {m: act for m, act in ours.items() if m not in theirs},
+                    {m: act for m, act in theirs.items() if m not in ours})
+        if depth <= 1 or engine.state.is_terminal():
+            return None
+        for masks in ours:
+            undo_ours, undo_theirs = engine.play(masks), reference.play(masks)
+            found = walk(depth - 1)
+            undo_ours()
+            undo_theirs()
+            if found is not None:
+                return found
+        return None
+
+    return walk(depth)
+
+
+GENERATORS = {
+    "actions": lambda state: EnginePerft(state),
+    "moves": lambda state: EnginePerft(state, moves=True),
+    "board": BoardPerft,
+}
+
+
+def _state_masks(state: GameState) -> tuple[int, int, int]:
+    return state.pads, state.red, state.blue
+
+
+def _board_masks(board: Board) -> tuple[int, int, int]:
+    return board.position()[:3]
+
+
+def _disagreement(counts: dict[str, int]) -> str:
+    # The generators grouped by the count they reached, e.g. "actions/moves 7791, board 7917"
+    groups = {}
+    for name, count in counts.items():
+        groups.setdefault(count, []).append(name)
+    return ", ".join(f"{'/'.join(names)} {count}" for count, names in groups.items())
+
+
+def _positions(given: list[str], count: int, plies: int, seed: int) -> list[GameState]:
+    # The given positions (the initial one if none), plus `count` positions
+    # `plies` random turns into a game
+    rng = random.Random(seed)
+    positions = [GameState.from_notation(text) for text in given] or [GameState()]
+    for _ in range(count):
+        state = GameState()
+        while state.turn < plies and not state.is_terminal():
+            state.apply_action(rng.choice(state.get_legal_actions()))
+        positions.append(state)
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="agent.perft",
+        description="Count and time move generation of the agent engine against the referee Board.")
+    parser.add_argument("--depth", type=int, default=3, help="deepest perft depth (turns)")
+    parser.add_argument("--generator", choices=[*GENERATORS, "all"], default="all",
+                        help="move generator to run (default: all, compared)")
+    parser.add_argument("--position", action="append", default=[],
+                        help="position in text notation (repeatable; default: the initial position)")
+    parser.add_argument("--random", type=int, default=0, help="random positions besides the initial one")
+    parser.add_argument("--plies", type=int, default=12, help="random turns played into each random position")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    names = list(GENERATORS) if args.generator == "all" else [args.generator]
+    mismatched = False
+    for state in _positions(args.position, args.random, args.plies, args.seed):
+        print(f"position {state.to_notation()}")
+        for depth in range(1, args.depth + 1):
+            counts = {}
+            for name in names:
+                start = time.process_time()
+                counts[name] = GENERATORS[name](state).perft(depth)
+                seconds = time.process_time() - start
+                rate = counts[name] / seconds if seconds > 0 else 0
+                print(f"  depth {depth}  {name:8} {counts[name]:>12}  {seconds:8.3f}s  {rate:>10.0f}/s")
+            if len(set(counts.values())) > 1:
+                mismatched = True
+                print(f"  MISMATCH at depth {depth}: {_disagreement(counts)}")
+                # divergence() compares the referee-facing actions with the
+                # Board, so it finds nothing when only the moves generator is off
+                found = divergence(state, depth) if "board" in counts else None
+                if found is not None:
+                    board, ours, theirs = found
+                    print(board)
+                    print(f"  engine only: {sorted(ours.values())}")
+                    print(f"  board only:  {sorted(theirs.values())}")
+                elif "board" in counts:
+                    print("  engine actions and Board successors agree; the engine's generators differ")
+                break
+    if mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,113 +4,396 @@
 from __future__ import annotations
 from typing import List
 from referee.game import PlayerColor, Coord, Direction, Action, MoveAction, GrowAction
+from referee.game import format_position, parse_position, pack_position, unpack_position
+from referee.game.geometry import CELLS, DIRECTIONS, DIRECTION_INDEX, DIRECTION_VECTORS, NEIGHBOURS
+import atexit
+import heapq
+import json
+import mmap
+import os
+import random
+import struct
+import sys
 import time
 
-class Agent:
+class BaseAgent:
     """
-    Freckers agent using alpha-beta pruning over GameState.
+    What every Freckers agent shares: the game state, kept up to date from the
+    referee's updates, and the per-turn CPU time budget.
     """
     def __init__(self, color: PlayerColor, **referee):
         self.color = color
         self.enemy = PlayerColor.RED if color == PlayerColor.BLUE else PlayerColor.BLUE
         self.state = GameState()
-        self.time_limit = 1.0  # seconds per move
+        self.time_limit = 1.0  # seconds per move when the referee sets no limit
+        self.time_reserve = 2.0  # seconds of CPU time kept back for safety
+
+    def update(self, color_of_player_who_acted: PlayerColor, action_performed: Action, **referee):
+        self.state.current_player = color_of_player_who_acted
+        self.state.apply_action(action_performed)
+
+    def _time_budget(self, time_remaining: float | None) -> float:
+        # Share the remaining CPU time evenly over our turns left before MAX_TURNS
+        if time_remaining is None:
+            return self.time_limit
+        turns_left = max(1, (GameState.MAX_TURNS - self.state.turn + 1) // 2)
+        return max(0.0, time_remaining - self.time_reserve) / turns_left
+
+
+class Agent(BaseAgent):
+    """
+    Freckers agent using alpha-beta pruning over GameState.
+    """
+    def __init__(self, color: PlayerColor, tt: TranspositionTable | None = None, **referee):
+        # tt: a table to search into instead of allocating one (see agent.analysis)
+        super().__init__(color, **referee)
+        self.max_depth = 32
+        self.aspiration_window = 200  # four rows of distance in _evaluate
+        # Selective search, each switchable on its own for benchmarking
+        self.null_move = True
+        self.null_move_reduction = 2
+        self.late_move_reductions = True
+        self.futility_pruning = True
+        self.futility_margin = 150  # a step forward plus a few moves of mobility
+        self.quiescence_depth = 2  # plies of jumps/goal-row entries past the horizon (0 = off)
+        self.tt_space_fraction = 0.25  # share of the referee's space limit for the table
+        self.tt = tt if tt is not None else TranspositionTable(self._tt_size_bits(
+            referee.get("space_remaining") or referee.get("space_limit")))
+        self.book = OpeningBook()
+        self.race = RaceSolver()  # exact play once the frogs are disengaged
+        self.race_time_fraction = 0.25  # share of a turn's budget the race solver may use
+        self.killers: List[List[int]] = [[] for _ in range(self.max_depth + 1)]  # move keys, per ply
+        self.history = [[0] * 4096, [0] * 4096]  # per colour, by move key
+        self.stats = SearchStats()  # one JSON line per turn on stderr, summary at game end
+        self.last_search: dict = {}  # statistics of the latest search()
+        self._deadline = 0.0
+        self._nodes = 0
+        self._evaluations = 0
+        self._tt_probes = 0
+        self._tt_hits = 0
+        self._cutoffs = 0
+        self._first_move_cutoffs = 0
 
     def action(self, **referee) -> Action:
-        start_time = time.time()
+        # Play the book move if there is one, or the solved race move once the
+        # frogs are disengaged; otherwise iterative deepening: search depth 1,
+        # 2, ... until the CPU budget for this turn runs out, then play the best
+        # move of the last completed depth
+        start = time.process_time()
         self.state.current_player = self.color
+        book_key, mirrored = self.state.canonical_key()
+        book_move = self.book.probe(book_key)
+        if book_move is not None:
+            if mirrored:
+                book_move = _MIRROR_MOVE[book_move]
+            book_action = self.state.action_for_key(book_move)
+            if book_action is not None:
+                return self._played(book_action, {"turn": self.state.turn, "source": "book"})
+        budget = self._time_budget(referee.get("time_remaining"))
+        race_action = self._race_action(start + budget * self.race_time_fraction)
+        if race_action is not None:
+            return self._played(race_action, {"turn": self.state.turn, "source": "race",
+                                              "seconds": round(time.process_time() - start, 4)})
+        size_bits = self._tt_size_bits(referee.get("space_remaining"))
+        if size_bits < self.tt.size_bits:
+            self.tt.resize(size_bits)
+        budget -= time.process_time() - start
+        _, _, best_action = self.search(max(0.0, budget))
+        return self._played(best_action, {"turn": self.state.turn, "source": "search", **self.last_search})
 
-        # Apply alpha-beta pruning
-        best_action = GrowAction()
-        best_value = float('-inf')
-        alpha, beta = float('-inf'), float('inf')
-        depth = 3
+    def search(self, budget: float, start_depth: int = 1) -> tuple[int, int, Action]:
+        # Iteratively deepen from start_depth on self.state for up to budget
+        # seconds of CPU time; returns (depth, score, best action) of the last
+        # completed iteration
+        start = time.process_time()
+        self._deadline = start + budget
+        self.tt.new_search()
+        self._age_move_ordering()
+        self._reset_counters()
 
-        for act in self.state.get_legal_actions():
-            next_state = self.state.clone()
-            next_state.apply_action(act)
-            value = self._min_value(next_state, depth - 1, alpha, beta, start_time)
-            if value > best_value:
-                best_value, best_action = value, act
-                alpha = max(alpha, value)
-            if alpha >= beta or time.time() - start_time > self.time_limit:
+        best_move = _GROW_KEY
+        value, completed = 0, 0
+        iteration_nodes = []  # nodes searched by the end of each completed depth
+        for depth in range(start_depth, self.max_depth + 1):
+            try:
+                value, move = self._aspiration(self.state.clone(), depth, value)
+            except _SearchTimeout:
+                break
+            best_move, completed = move, depth
+            iteration_nodes.append(self._nodes)
+            if abs(value) >= WIN_SCORE or time.process_time() - start > budget / 2:
                 break
 
-        return best_action
+        self.last_search = self._counters(completed, iteration_nodes, time.process_time() - start)
+        return completed, value, self.state.action_for_key(best_move)
 
     def update(self, color_of_player_who_acted: PlayerColor, action_performed: Action, **referee):
-        self.state.current_player = color_of_player_who_acted
-        self.state.apply_action(action_performed)
+        super().update(color_of_player_who_acted, action_performed, **referee)
+        if self.state.is_terminal():
+            self.stats.finish()
 
-    def _max_value(self, state: GameState, depth: int, alpha: float, beta: float, start_time: float) -> float:
-        # Function to calculate the maximum value of a state
-        if depth == 0 or state.is_terminal():
-            return self._evaluate(state)
-        value = float('-inf')
-        for act in state.get_legal_actions():
-            nxt = state.clone()
-            nxt.apply_action(act)
-            value = max(value, self._min_value(nxt, depth - 1, alpha, beta, start_time))
-            if value >= beta or time.time() - start_time > self.time_limit:
-                return value
-            alpha = max(alpha, value)
-        return value
-
-    def _min_value(self, state: GameState, depth: int, alpha: float, beta: float, start_time: float) -> float:
-        # Function to calculate the minimum value of a state
-        if depth == 0 or state.is_terminal():
-            return self._evaluate(state)
-        value = float('inf')
-        for act in state.get_legal_actions():
-            nxt = state.clone()
-            nxt.apply_action(act)
-            value = min(value, self._max_value(nxt, depth - 1, alpha, beta, start_time))
-            if value <= alpha or time.time() - start_time > self.time_limit:
+    def _played(self, action: Action, turn: dict) -> Action:
+        # Record the turn's statistics and return action. The referee ends the
+        # game without calling update() once a move finishes it, so if this one
+        # does, write the game summary now.
+        self.stats.record(turn)
+        undo = self.state.apply_action(action)
+        if self.state.is_terminal():
+            self.stats.finish()
+        self.state.undo_action(undo)
+        return action
+
+    def _reset_counters(self):
+        # Zero the search counters at the start of a search
+        self._nodes = self._evaluations = 0
+        self._tt_probes = self._tt_hits = 0
+        self._cutoffs = self._first_move_cutoffs = 0
+
+    def _counters(self, depth: int, iteration_nodes: List[int], seconds: float) -> dict:
+        # Statistics of the search just finished. The effective branching factor
+        # is the ratio of the node counts of the last two completed depths.
+        iterations = [b - a for a, b in zip([0] + iteration_nodes, iteration_nodes)]
+        return {
+            "depth": depth,
+            "seconds": round(seconds, 4),
+            "nodes": self._nodes,
+            "nps": round(self._nodes / seconds) if seconds > 0 else 0,
+            "evaluations": self._evaluations,
+            "tt_probes": self._tt_probes,
+            "tt_hits": self._tt_hits,
+            "tt_hit_rate": _rate(self._tt_hits, self._tt_probes),
+            "cutoffs": self._cutoffs,
+            "first_move_cutoffs": self._first_move_cutoffs,
+            "first_move_cutoff_rate": _rate(self._first_move_cutoffs, self._cutoffs),
+            "ebf": _rate(iterations[-1], iterations[-2]) if len(iterations) >= 2 else None,
+        }
+
+    def _race_action(self, deadline: float) -> Action | None:
+        # First move of our fastest race home, if the frogs are disengaged and
+        # we can finish within MAX_TURNS (past it the goal-row count decides,
+        # which the race solver does not model); the solver gives up at
+        # deadline (process time)
+        if not RaceSolver.disengaged(self.state):
+            return None
+        solved = self.race.solve(self.state, self.color, deadline)
+        if solved is None or self.state.turn + 2 * solved[0] - 1 > GameState.MAX_TURNS:
+            return None
+        return self.state.action_for_key(solved[1])
+
+    def _age_move_ordering(self):
+        # Killers are position-specific, so drop them; halve history so it tracks recent play
+        for killers in self.killers:
+            killers.clear()
+        for history in self.history:
+            for i, score in enumerate(history):
+                if score:
+                    history[i] = score >> 1
+
+    def _tt_size_bits(self, space_mb: float | None) -> int:
+        # Largest table (as log2 of its bucket count) that fits our share of the
+        # referee's memory limit, in MB; 2^16 buckets when there is no limit
+        if space_mb is None:
+            return 16
+        budget = space_mb * self.tt_space_fraction * 1024 * 1024
+        buckets = max(1, int(budget / (2 * TranspositionTable.BYTES_PER_SLOT)))
+        return max(10, min(20, buckets.bit_length() - 1))
+
+    def _aspiration(self, state: GameState, depth: int, guess: int) -> tuple[int, int]:
+        # Search the root in a narrow window around the previous iteration's
+        # score, widening on whichever side the result falls outside it
+        if depth == 1 or abs(guess) >= WIN_SCORE:
+            return self._search_root(state, depth, -_INFINITY, _INFINITY)
+        delta = self.aspiration_window
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            value, move = self._search_root(state, depth, alpha, beta)
+            if value <= alpha:
+                alpha = -_INFINITY if delta > WIN_SCORE else value - delta
+            elif value >= beta:
+                beta = _INFINITY if delta > WIN_SCORE else value + delta
+            else:
+                return value, move
+            delta *= 4
+
+    def _search_root(self, state: GameState, depth: int, alpha: int, beta: int) -> tuple[int, int]:
+        # Principal variation search over the root's children, previous best
+        # first; returns (value, best move key)
+        key, mirrored = state.canonical_key()
+        _, hash_move = self._probe(key, mirrored, depth, alpha, beta)
+        alpha_orig = alpha
+        best_value, best_key = -_INFINITY, None
+        for move_key in state.iter_moves(hash_move, self.killers[0], self.history[state.current_player]):
+            undo = state.apply_move(move_key)
+            if best_key is None:
+                value = -self._negamax(state, depth - 1, -beta, -alpha, 1)
+            else:
+                value = -self._negamax(state, depth - 1, -alpha - 1, -alpha, 1)
+                if alpha < value < beta:
+                    value = -self._negamax(state, depth - 1, -beta, -alpha, 1)
+            state.undo_action(undo)
+            if value > best_value or best_key is None:
+                best_value, best_key = value, move_key
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        self._store(key, mirrored, depth, _bound(best_value, alpha_orig, beta), best_value, best_key)
+        return best_value, best_key
+
+    def _tick(self):
+        # Count a node, checking the CPU deadline every 1024 nodes
+        self._nodes += 1
+        if not self._nodes & 1023 and time.process_time() > self._deadline:
+            raise _SearchTimeout
+
+    def _negamax(self, state: GameState, depth: int, alpha: int, beta: int, ply: int, allow_null: bool = True) -> int:
+        # Principal variation search: the value of state for the side to move.
+        # The first child gets the full window, later ones a zero window that is
+        # only widened (re-searched) if the child turns out better than alpha
+        self._tick()
+        if state.is_terminal():
+            return self._static_value(state)
+        if depth <= 0:
+            return self._quiesce(state, alpha, beta, self.quiescence_depth)
+        key, mirrored = state.canonical_key()
+        cached, hash_move = self._probe(key, mirrored, depth, alpha, beta)
+        if cached is not None:
+            return cached
+        pv_node = beta - alpha > 1
+
+        # Null move: let the opponent move twice; if we still beat beta, prune
+        if self.null_move and allow_null and not pv_node and depth >= 3 \
+                and self._static_value(state) >= beta:
+            state.apply_null_action()
+            value = -self._negamax(state, depth - 1 - self.null_move_reduction, -beta, -beta + 1, ply + 1, False)
+            state.undo_null_action()
+            if value >= beta:
                 return value
-            beta = min(beta, value)
-        return value
 
-    def _evaluate(self, state: GameState) -> float:
-        # Heuristic evaluation function for alpha-beta pruning, involving multiple factors:
-        
-        # Distance to goal rows
-        red_dist = sum((7 - pos.r) for pos, owner in state.frogs.items() if owner == PlayerColor.RED)
-        blue_dist = sum(pos.r for pos, owner in state.frogs.items() if owner == PlayerColor.BLUE)
-        dist_score = (blue_dist - red_dist) if self.color == PlayerColor.RED else (red_dist - blue_dist)
+        # Futility: at the frontier, quiet moves cannot lift a hopeless static score past alpha
+        futile = False
+        if self.futility_pruning and depth == 1 and not pv_node:
+            static = self._static_value(state)
+            futile = static + self.futility_margin <= alpha
 
-        # Number of legal moves
-        my_moves = len(state.get_legal_actions())
-        state.current_player = self.enemy
-        opp_moves = len(state.get_legal_actions())
-        state.current_player = self.color
-        mobility_score = my_moves - opp_moves
+        alpha_orig = alpha
+        best_value, best_key = -_INFINITY, None
+        history = self.history[state.current_player]
+        for index, move_key in enumerate(state.iter_moves(hash_move, self.killers[ply], history)):
+            if futile and _QUIET[move_key]:
+                best_value = max(best_value, static)
+                continue
+            undo = state.apply_move(move_key)
+            if best_key is None:
+                value = -self._negamax(state, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Late lateral steps are searched one ply shallower first
+                reduce = self.late_move_reductions and depth >= 3 and index >= 3 and _LATERAL_STEP[move_key]
+                value = -self._negamax(state, depth - 1 - reduce, -alpha - 1, -alpha, ply + 1)
+                if reduce and value > alpha:
+                    value = -self._negamax(state, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < value < beta:
+                    value = -self._negamax(state, depth - 1, -beta, -alpha, ply + 1)
+            state.undo_action(undo)
+            if value > best_value or best_key is None:
+                best_value, best_key = value, move_key
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self._cutoffs += 1
+                self._first_move_cutoffs += index == 0
+                self._record_cutoff(history, ply, depth, move_key)
+                break
+        self._store(key, mirrored, depth, _bound(best_value, alpha_orig, beta), best_value, best_key)
+        return best_value
 
-        # Number of adjacent lily pads
-        pad_bonus = 0
-        for pos, owner in state.frogs.items():
-            cnt = 0
-            for d in Direction:
-                try:
-                    nbr = pos + d
-                    if 0 <= nbr.r < 8 and 0 <= nbr.c < 8 and nbr in state.lily_pads:
-                        cnt += 1
-                except ValueError:
-                    continue
-            pad_bonus += cnt if owner == self.color else -cnt
+    def _quiesce(self, state: GameState, alpha: int, beta: int, depth: int) -> int:
+        # Quiescence search: keep following forward jumps and goal-row entries
+        # (which swing the row-distance term) until the position is quiet,
+        # standing pat on the static score whenever that is good enough
+        stand_pat = self._static_value(state)
+        if depth == 0 or stand_pat >= beta or state.is_terminal():
+            return stand_pat
+        best_value = stand_pat
+        alpha = max(alpha, stand_pat)
+        for move_key in state.iter_tactical_moves():
+            self._tick()
+            undo = state.apply_move(move_key)
+            value = -self._quiesce(state, -beta, -alpha, depth - 1)
+            state.undo_action(undo)
+            if value > best_value:
+                best_value = value
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        return best_value
+
+    def _static_value(self, state: GameState) -> int:
+        # _evaluate from the side to move's point of view
+        value = self._evaluate(state)
+        return value if state.current_player == self.color else -value
+
+    def _record_cutoff(self, history: List[int], ply: int, depth: int, move_key: int):
+        # Remember a quiet move that caused a cutoff as a killer and in the history table
+        if not _QUIET[move_key]:
+            return
+        history[move_key] += depth * depth
+        killers = self.killers[ply]
+        if not killers or killers[0] != move_key:
+            killers.insert(0, move_key)
+            del killers[2:]
+
+    def _probe(self, key: int, mirrored: bool, depth: int, alpha: int, beta: int):
+        # Look the position up in the transposition table by its canonical key
+        # before generating moves. Returns (value, None) on a usable bound, else
+        # (None, stored best move), the move reflected back if the key is mirrored
+        self._tt_probes += 1
+        entry = self.tt.probe(key)
+        if entry is None:
+            return None, None
+        self._tt_hits += 1
+        entry_depth, flag, value, move, _ = entry
+        if mirrored and move is not None:
+            move = _MIRROR_MOVE[move]
+        if entry_depth >= depth:
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value, move
+        return None, move
+
+    def _store(self, key: int, mirrored: bool, depth: int, flag: int, value: int, move: int | None):
+        # Store a search result under a canonical key, reflecting the move with it
+        if mirrored and move is not None:
+            move = _MIRROR_MOVE[move]
+        self.tt.store(key, depth, flag, value, move)
 
+    def _evaluate(self, state: GameState) -> int:
+        # Heuristic evaluation function for alpha-beta pruning, involving multiple
+        # factors; all of them are read from features GameState keeps incrementally
+        self._evaluations += 1
         if state.is_terminal():
             winner = state.get_winner()
             if winner == self.color:
-                return float('inf')
+                return WIN_SCORE
             if winner == self.enemy:
-                return float('-inf')
+                return -WIN_SCORE
+
+        # Distance to goal rows
+        dist_score = state.blue_dist - state.red_dist
+
+        # Number of moves available (steps and single hops, plus GROW)
+        mobility_score = state.pseudo_mobility(PlayerColor.RED) - state.pseudo_mobility(PlayerColor.BLUE)
+
+        # Number of adjacent lily pads
+        pad_bonus = state.red_pad_adj - state.blue_pad_adj
 
-        return 50 * dist_score + 10 * mobility_score + pad_bonus
+        score = 50 * dist_score + 10 * mobility_score + pad_bonus
+        return score if self.color == PlayerColor.RED else -score
 
 class GameState:
     """
-    Freckers game state: tracks lily pads, frog positions,
-    current player, and turn counter.
+    Freckers game state: tracks lily pads, red frogs and blue frogs as 64-bit
+    masks (bit r * 8 + c), plus the current player and turn counter.
     """
     RED_DIRS = [Direction.Right, Direction.Left, Direction.Down, Direction.DownRight, Direction.DownLeft]
     BLUE_DIRS = [Direction.Right, Direction.Left, Direction.Up, Direction.UpRight, Direction.UpLeft]
@@ -118,151 +401,904 @@ class GameState:
     MAX_TURNS = 150
 
     def __init__(self, lily_pads=None, frogs=None, current_player=PlayerColor.RED, turn=0):
-        # Initialize the game state
+        # Initialize the game state from coordinate collections (or the initial board)
         if lily_pads is None or frogs is None:
-            self.lily_pads, self.frogs = self._init_board()
+            self.pads, self.red, self.blue = self._init_board()
         else:
-            self.lily_pads = set(lily_pads)
-            self.frogs = dict(frogs)
+            self.pads = _mask_of(lily_pads)
+            self.red = _mask_of(pos for pos, owner in frogs.items() if owner == PlayerColor.RED)
+            self.blue = _mask_of(pos for pos, owner in frogs.items() if owner == PlayerColor.BLUE)
         self.current_player = current_player
         self.turn = turn
+        self.key = _board_key(self.pads, self.red, self.blue)
+        self._init_features()
+
+    def _init_features(self):
+        # Evaluation features kept up to date by apply_action/undo_action: summed
+        # rows to the goal, frogs on the goal row and lily pads next to each side's frogs
+        self.red_dist = sum((7 - sq // 8) for sq in _squares(self.red))
+        self.blue_dist = sum(sq // 8 for sq in _squares(self.blue))
+        self.red_home = (self.red & _ROW_MASKS[7]).bit_count()
+        self.blue_home = (self.blue & _ROW_MASKS[0]).bit_count()
+        self.red_pad_adj = sum((_ADJACENT[sq] & self.pads).bit_count() for sq in _squares(self.red))
+        self.blue_pad_adj = sum((_ADJACENT[sq] & self.pads).bit_count() for sq in _squares(self.blue))
+
+    @classmethod
+    def from_masks(cls, pads: int, red: int, blue: int, current_player=PlayerColor.RED, turn=0) -> GameState:
+        # Build a state directly from lily pad / red frog / blue frog masks
+        state = cls.__new__(cls)
+        state.pads, state.red, state.blue = pads, red, blue
+        state.current_player = current_player
+        state.turn = turn
+        state.key = _board_key(pads, red, blue)
+        state._init_features()
+        return state
+
+    @classmethod
+    def from_notation(cls, text: str) -> GameState:
+        # Build a state from the text notation shared with the referee's Board
+        return cls.from_masks(*parse_position(text))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> GameState:
+        # Build a state from its 16-byte packing (see referee.game.notation)
+        return cls.from_masks(*unpack_position(data))
+
+    def mirrored(self) -> GameState:
+        # The left-right mirror image of this state (c -> 7 - c)
+        return GameState.from_masks(_mirror_mask(self.pads), _mirror_mask(self.red),
+                                    _mirror_mask(self.blue), self.current_player, self.turn)
+
+    def to_notation(self) -> str:
+        return format_position(self.pads, self.red, self.blue, self.current_player, self.turn)
+
+    def pack(self) -> bytes:
+        return pack_position(self.pads, self.red, self.blue, self.current_player, self.turn)
 
     def _init_board(self):
         # Initial lily pad and frog placement based on the rules
-        initial_lily = set([
-            Coord(0,0),Coord(0,1),Coord(0,2),Coord(0,3),Coord(0,4),Coord(0,5),Coord(0,6),Coord(0,7),
-            Coord(1,1),Coord(1,2),Coord(1,3),Coord(1,4),Coord(1,5),Coord(1,6),
-            Coord(6,1),Coord(6,2),Coord(6,3),Coord(6,4),Coord(6,5),Coord(6,6),
-            Coord(7,0),Coord(7,1),Coord(7,2),Coord(7,3),Coord(7,4),Coord(7,5),Coord(7,6),Coord(7,7)
-        ])
-        initial_frogs = {
-            Coord(0, 1): PlayerColor.RED, Coord(0, 2): PlayerColor.RED,
-            Coord(0, 3): PlayerColor.RED, Coord(0, 4): PlayerColor.RED,
-            Coord(0, 5): PlayerColor.RED, Coord(0, 6): PlayerColor.RED,
-            Coord(7, 1): PlayerColor.BLUE, Coord(7, 2): PlayerColor.BLUE,
-            Coord(7, 3): PlayerColor.BLUE, Coord(7, 4): PlayerColor.BLUE,
-            Coord(7, 5): PlayerColor.BLUE, Coord(7, 6): PlayerColor.BLUE
-        }
-        return initial_lily, initial_frogs
+        pads = _ROW_MASKS[0] | _ROW_MASKS[7] | (_INNER_COLS & (_ROW_MASKS[1] | _ROW_MASKS[6]))
+        return pads, _INNER_COLS & _ROW_MASKS[0], _INNER_COLS & _ROW_MASKS[7]
+
+    @property
+    def lily_pads(self) -> set[Coord]:
+        # Lily pads as coordinates (for debugging; the search works on masks)
+        return {_COORDS[sq] for sq in _squares(self.pads)}
+
+    @property
+    def frogs(self) -> dict[Coord, PlayerColor]:
+        # Frog positions as coordinates (for debugging; the search works on masks)
+        frogs = {_COORDS[sq]: PlayerColor.RED for sq in _squares(self.red)}
+        frogs.update({_COORDS[sq]: PlayerColor.BLUE for sq in _squares(self.blue)})
+        return frogs
 
     def clone(self):
-        # Create a deep copy of the game state for simulation in alpha-beta pruning search
-        return GameState(self.lily_pads, self.frogs, self.current_player, self.turn)
+        # Create a copy of the game state for simulation in alpha-beta pruning search
+        state = GameState.__new__(GameState)
+        state.pads, state.red, state.blue = self.pads, self.red, self.blue
+        state.current_player = self.current_player
+        state.turn = self.turn
+        state.key = self.key
+        state.red_dist, state.blue_dist = self.red_dist, self.blue_dist
+        state.red_home, state.blue_home = self.red_home, self.blue_home
+        state.red_pad_adj, state.blue_pad_adj = self.red_pad_adj, self.blue_pad_adj
+        return state
+
+    def canonical_key(self) -> tuple[int, bool]:
+        # Zobrist key (cells plus side to move) of whichever of this position and
+        # its left-right mirror image has the smaller key, and whether that is
+        # the mirror image. The rules and _evaluate are symmetric under the
+        # reflection, so caches keyed by it share entries between the two; moves
+        # stored under a mirrored key go through _MIRROR_MOVE on the way in and out.
+        key, mirror = self.key & _KEY_MASK, self.key >> 64
+        if self.current_player == PlayerColor.BLUE:
+            key ^= _ZOBRIST_BLUE_TO_MOVE
+            mirror ^= _ZOBRIST_BLUE_TO_MOVE
+        return (mirror, True) if mirror < key else (key, False)
 
     def get_legal_actions(self) -> List[Action]:
         # Generate all legal actions for the current player
-        player = self.current_player
-        actions: List[Action] = []
-        dirs = self.RED_DIRS if player == PlayerColor.RED else self.BLUE_DIRS
+        own, dirs, sign = self._side()
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        keyed = []
 
-        for start_pos, frog_owner in self.frogs.items():
-            if frog_owner != player:
-                continue
+        mask = own
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            mask ^= low
 
             # Single-step hops
             for d in dirs:
-                try:
-                    dst = start_pos + d
-                    if dst in self.lily_pads and dst not in self.frogs:
-                        actions.append(MoveAction(start_pos, (d,)))
-                except ValueError:
-                    pass
+                dst = _STEP[d][start]
+                if dst >= 0 and free_pads >> dst & 1:
+                    keyed.append(((1, -sign * _FORWARD[d], _LATERAL[d]),
+                                  MoveAction(_COORDS[start], (_DIRS[d],))))
+
+            # Multi-step jumps, one per distinct landing square
+            jumps = []
+            self._jump_moves(dirs, sign, occupied, free_pads, start, jumps)
+            keyed.extend(((0, -forward, lateral), act) for forward, lateral, _, act in jumps)
 
-            # Multi-step jumps
-            self._get_all_jump_sequences(player, start_pos, start_pos, [], actions, set())
+        # Prioritise jumps and vertical moves over left and right moves
+        keyed.sort(key=lambda item: item[0])
+        actions: List[Action] = [act for _, act in keyed]
 
         # Grow is always allowed
         actions.append(GrowAction())
-
-        def action_priority(act: Action):
-            # Prioritise jumps and vertical moves over left and right moves
-            if isinstance(act, MoveAction):
-                is_jump = len(act.directions) > 1
-                start_pos = act.coord
-                dst = start_pos
-                for step in act.directions:
-                    dst = dst + step
-                forward_delta = (dst.r - start_pos.r) if player == PlayerColor.RED else (start_pos.r - dst.r)
-                lateral_delta = abs(dst.c - start_pos.c)
-                return (0 if is_jump else 1, -forward_delta, lateral_delta)
-            return (2, 0, 0)
-
-        actions.sort(key=action_priority)
         return actions
 
-    def _get_all_jump_sequences(self, player, original_start, current_pos, current_path_dirs, legal_actions_list, visited_landings):
-        jump_dirs = self.RED_DIRS if player == PlayerColor.RED else self.BLUE_DIRS
-        # Get all possible jump sequences from the current position
-        for d in jump_dirs:
-            try:
-                mid = current_pos + d
-                landing = mid + d
-                if (mid in self.frogs and landing in self.lily_pads
-                    and landing not in self.frogs and landing not in visited_landings):
-
-                    new_path = current_path_dirs + [d]
-                    legal_actions_list.append(MoveAction(original_start, tuple(new_path)))
-                    visited_landings.add(landing)
-                    self._get_all_jump_sequences(player, original_start, landing, new_path, legal_actions_list, visited_landings)
-                    visited_landings.remove(landing)
-            except ValueError:
-                continue
+    def iter_moves(self, hash_move: int | None = None, killers=(), history=None):
+        # Staged, lazy move generation for the search. Yields move keys
+        # (from_square << 6 | to_square, 0 for GROW): the hash move, jumps,
+        # killers, forward steps, laterals, then GROW. Moves with the same key
+        # reach the same position, so each key is yielded at most once, and
+        # no Action is built; action_for_key recovers one for the chosen move.
+        seen = set()
+        if hash_move is not None and self.is_legal_move(hash_move):
+            seen.add(hash_move)
+            yield hash_move
+
+        own, dirs, sign = self._side()
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+
+        # Jumps, furthest forward first
+        jumps = []
+        mask = own
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            mask ^= low
+            self._jump_keys(dirs, sign, occupied, free_pads, start, jumps)
+        jumps.sort()
+        for _, _, key in jumps:
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+        # Quiet moves that caused cutoffs at this ply elsewhere in the tree
+        for key in killers:
+            if key not in seen and self.is_legal_move(key):
+                seen.add(key)
+                yield key
+
+        # Forward steps, then lateral steps, each by history score
+        forward, lateral = [], []
+        mask = own
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            mask ^= low
+            for d in dirs:
+                dst = _STEP[d][start]
+                if dst >= 0 and free_pads >> dst & 1:
+                    (lateral if _FORWARD[d] == 0 else forward).append(start << 6 | dst)
+        for steps in (forward, lateral):
+            if history is not None:
+                steps.sort(key=lambda key: -history[key])
+            for key in steps:
+                if key not in seen:
+                    yield key
+
+        if _GROW_KEY not in seen:
+            yield _GROW_KEY
 
-    def apply_action(self, action):
-        # Apply the action to the game state
+    def iter_tactical_moves(self):
+        # The noisy subset of iter_moves used by quiescence search: jumps that
+        # gain at least one row (furthest first) and steps onto the goal row
+        own, dirs, sign = self._side()
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        goal_row = _ROW_MASKS[7] if sign > 0 else _ROW_MASKS[0]
+        jumps, entries = [], []
+        mask = own
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            mask ^= low
+            self._jump_keys(dirs, sign, occupied, free_pads, start, jumps)
+            if not goal_row & low:
+                for d in dirs:
+                    dst = _STEP[d][start]
+                    if dst >= 0 and (free_pads & goal_row) >> dst & 1:
+                        entries.append(start << 6 | dst)
+        jumps.sort()
+        for back, _, key in jumps:
+            if back < 0:
+                yield key
+        yield from entries
+
+    def is_legal_move(self, key: int) -> bool:
+        # Whether a move key is a legal move of the current player in this state
+        if key == _GROW_KEY:
+            return True
+        own, dirs, _ = self._side()
+        start, dst = key >> 6, key & 63
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        if not own >> start & 1 or not free_pads >> dst & 1:
+            return False
+        if _QUIET[key]:
+            return any(_STEP[d][start] == dst for d in dirs)
+        return bool(_jump_landings(dirs, occupied, free_pads, start) >> dst & 1)
+
+    def action_for_key(self, key: int) -> Action | None:
+        # Action reaching the position a move key describes, or None if no legal
+        # action of the current player has that key
+        if key == _GROW_KEY:
+            return GrowAction()
+        own, dirs, sign = self._side()
+        start, dst = key >> 6, key & 63
+        if not own >> start & 1:
+            return None
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        if _QUIET[key]:
+            for d in dirs:
+                if _STEP[d][start] == dst and free_pads >> dst & 1:
+                    return MoveAction(_COORDS[start], (_DIRS[d],))
+            return None
+        jumps = []
+        self._jump_moves(dirs, sign, occupied, free_pads, start, jumps)
+        for _, _, jump_key, act in jumps:
+            if jump_key == key:
+                return act
+        return None
+
+    def action_key(self, action: Action) -> int:
+        # Move key (from_square << 6 | to_square, 0 for GROW) of an action, or -1
+        # if it is not a legal action for the current player in this state
+        if isinstance(action, GrowAction):
+            return _GROW_KEY
+        own, dirs, _ = self._side()
+        start = action.coord.r * 8 + action.coord.c
+        if not own >> start & 1 or not action.directions:
+            return -1
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        if len(action.directions) == 1:
+            d = _DIR_INDEX[action.directions[0]]
+            dst = _STEP[d][start]
+            if d in dirs and dst >= 0 and free_pads >> dst & 1:
+                return start << 6 | dst
+        # A jump chain: each hop over an occupied cell onto an unoccupied one,
+        # ending on a free pad
+        pos = start
+        for direction in action.directions:
+            d = _DIR_INDEX[direction]
+            mid = _STEP[d][pos]
+            land = _STEP[d][mid] if mid >= 0 else -1
+            if d not in dirs or land < 0 or not occupied >> mid & 1 or occupied >> land & 1:
+                return -1
+            pos = land
+        return start << 6 | pos if free_pads >> pos & 1 else -1
+
+    def _side(self):
+        # Own frogs, legal direction indices and forward row sign for the current player
+        if self.current_player == PlayerColor.RED:
+            return self.red, _RED_DIR_IDX, 1
+        return self.blue, _BLUE_DIR_IDX, -1
+
+    def _jump_moves(self, dirs, sign, occupied, free_pads, start, jumps):
+        # Append a (forward delta, lateral delta, move key, action) entry for each
+        # distinct free pad the frog on start can reach by jumping, with one
+        # shortest jump path each (through any unoccupied cells, as in
+        # _jump_landings)
+        for d in dirs:
+            mid = _STEP[d][start]
+            if mid >= 0 and occupied >> mid & 1 and _STEP[d][mid] >= 0 and not occupied >> _STEP[d][mid] & 1:
+                break
+        else:
+            return
+        last_dir = {}
+        reached = 0
+        frontier = 1 << start
+        while frontier:
+            # One more hop from every square reached by the previous hop
+            new = 0
+            for d in dirs:
+                shift, sources = _SHIFT[d], _SHIFT_SOURCES[d]
+                if shift > 0:
+                    mids = ((frontier & sources) << shift) & occupied & sources
+                    lands = (mids << shift) & ~occupied & ~(reached | new)
+                else:
+                    mids = ((frontier & sources) >> -shift) & occupied & sources
+                    lands = (mids >> -shift) & ~occupied & ~(reached | new)
+                new |= lands
+                while lands:
+                    low = lands & -lands
+                    last_dir[low.bit_length() - 1] = d
+                    lands ^= low
+            reached |= new
+            frontier = new
+
+        reached &= free_pads
+        while reached:
+            low = reached & -reached
+            landing = low.bit_length() - 1
+            reached ^= low
+            path = []
+            sq = landing
+            while sq != start:
+                d = last_dir[sq]
+                path.append(_DIRS[d])
+                sq -= 2 * _SHIFT[d]
+            path.reverse()
+            jumps.append((sign * (landing // 8 - start // 8), abs(landing % 8 - start % 8),
+                          start << 6 | landing, MoveAction(_COORDS[start], tuple(path))))
+
+    def _jump_keys(self, dirs, sign, occupied, free_pads, start, jumps):
+        # Append a (rows lost, lateral delta, move key) entry for each distinct
+        # square the frog on start can reach by jumping; sorting them puts the
+        # furthest forward first. Unlike _jump_moves, no jump path is built.
+        landings = _jump_landings(dirs, occupied, free_pads, start)
+        while landings:
+            low = landings & -landings
+            landing = low.bit_length() - 1
+            landings ^= low
+            jumps.append((sign * (start // 8 - landing // 8), abs(landing % 8 - start % 8), start << 6 | landing))
+
+    def apply_action(self, action) -> tuple[int, int, int]:
+        # Apply a referee action in place by way of its move key, returning the
+        # undo record from apply_move
         if isinstance(action, GrowAction):
-            new_pads = set()
-            for pos, owner in self.frogs.items():
-                if owner != self.current_player: continue
-                for d in self.ALL_DIRS:
-                    try:
-                        pad = pos + d
-                        if 0 <= pad.r < 8 and 0 <= pad.c < 8 and pad not in self.lily_pads and pad not in self.frogs:
-                            new_pads.add(pad)
-                    except ValueError:
-                        pass
-            self.lily_pads |= new_pads
+            return self.apply_move(_GROW_KEY)
+        # Resolved as the referee does: one direction onto an unoccupied cell
+        # is a step; otherwise every direction is a hop over an occupied cell
+        # onto an unoccupied one, and only the final landing needs a pad
+        start = action.coord.r * 8 + action.coord.c
+        occupied = self.red | self.blue
+        directions = action.directions
+        if len(directions) == 1:
+            dst = _STEP[_DIR_INDEX[directions[0]]][start]
+            if dst < 0:
+                raise ValueError(f"Out-of-bounds move: {action}")
+            if not occupied >> dst & 1:
+                return self.apply_move(start << 6 | dst)
+        pos = start
+        for direction in directions:
+            d = _DIR_INDEX[direction]
+            mid = _STEP[d][pos]
+            land = _STEP[d][mid] if mid >= 0 else -1
+            if land < 0 or not occupied >> mid & 1 or occupied >> land & 1:
+                raise ValueError(f"Illegal jump: {action}")
+            pos = land
+        return self.apply_move(start << 6 | pos)
+
+    def apply_move(self, key: int) -> tuple[int, int, int]:
+        # Apply a move key in place, returning an undo record of the changed
+        # cells: (moved frog's from/to bits, consumed pad bit, grown pad bits)
+        if key == _GROW_KEY:
+            own = self.red if self.current_player == PlayerColor.RED else self.blue
+            reach = 0
+            while own:
+                low = own & -own
+                reach |= _ADJACENT[low.bit_length() - 1]
+                own ^= low
+            grown = reach & ~(self.pads | self.red | self.blue)
+            self.pads |= grown
+            undo = (0, 0, grown)
+            self.key ^= _cells_key(_ZOBRIST_PAD, grown)
+            self._grow_features(grown, 1)
         else:
-            start_pos = action.coord
-            if start_pos in self.lily_pads:
-                self.lily_pads.remove(start_pos)
-            pos = start_pos
-            for d in action.directions:
-                try:
-                    mid = pos + d
-                    land = mid + d
-                    if mid in self.frogs and land in self.lily_pads and land not in self.frogs:
-                        pos = land
-                    else:
-                        pos = pos + d
-                except ValueError:
-                    pos = pos + d
-            self.frogs.pop(start_pos)
-            self.frogs[pos] = self.current_player
+            start, pos = key >> 6, key & 63
+            consumed = self.pads & (1 << start)
+            self._move_features(start, pos, consumed, 1)
+            self.pads ^= consumed
+            moved = (1 << start) | (1 << pos)
+            if self.current_player == PlayerColor.RED:
+                self.red ^= moved
+                self.key ^= _ZOBRIST_RED[start] ^ _ZOBRIST_RED[pos]
+            else:
+                self.blue ^= moved
+                self.key ^= _ZOBRIST_BLUE[start] ^ _ZOBRIST_BLUE[pos]
+            if consumed:
+                self.key ^= _ZOBRIST_PAD[start]
+            undo = (moved, consumed, 0)
 
         self.current_player = PlayerColor.BLUE if self.current_player == PlayerColor.RED else PlayerColor.RED
         self.turn += 1
+        return undo
+
+    def apply_null_action(self):
+        # Pass the turn without changing the board (null-move pruning only)
+        self.current_player = PlayerColor.BLUE if self.current_player == PlayerColor.RED else PlayerColor.RED
+        self.turn += 1
+
+    def undo_null_action(self):
+        # Revert apply_null_action
+        self.current_player = PlayerColor.BLUE if self.current_player == PlayerColor.RED else PlayerColor.RED
+        self.turn -= 1
+
+    def undo_action(self, undo: tuple[int, int, int]):
+        # Revert the action that returned this undo record from apply_action
+        moved, consumed, grown = undo
+        self.turn -= 1
+        self.current_player = PlayerColor.BLUE if self.current_player == PlayerColor.RED else PlayerColor.RED
+        if self.current_player == PlayerColor.RED:
+            landed = self.red & moved
+            self.red ^= moved
+            self.key ^= _cells_key(_ZOBRIST_RED, moved)
+        else:
+            landed = self.blue & moved
+            self.blue ^= moved
+            self.key ^= _cells_key(_ZOBRIST_BLUE, moved)
+        self.pads = (self.pads | consumed) & ~grown
+        self.key ^= _cells_key(_ZOBRIST_PAD, consumed | grown)
+        if moved:
+            self._move_features((moved ^ landed).bit_length() - 1, landed.bit_length() - 1, consumed, -1)
+        else:
+            self._grow_features(grown, -1)
+
+    def _move_features(self, start, pos, consumed, scale):
+        # Add scale times the feature change from moving the current player's frog
+        # start -> pos (consuming the pad bits in consumed). Masks must be pre-move.
+        own_adj = (_ADJACENT[pos] & self.pads & ~consumed).bit_count() - (_ADJACENT[start] & self.pads).bit_count()
+        rows = pos // 8 - start // 8
+        if self.current_player == PlayerColor.RED:
+            self.red_dist -= scale * rows
+            self.red_home += scale * ((pos >= 56) - (start >= 56))
+            self.red_pad_adj += scale * own_adj
+        else:
+            self.blue_dist += scale * rows
+            self.blue_home += scale * ((pos < 8) - (start < 8))
+            self.blue_pad_adj += scale * own_adj
+        if consumed:
+            self.red_pad_adj -= scale * (_ADJACENT[start] & self.red).bit_count()
+            self.blue_pad_adj -= scale * (_ADJACENT[start] & self.blue).bit_count()
+
+    def _grow_features(self, grown, scale):
+        # Add scale times the pad-adjacency change from growing the pads in grown
+        red_gain = blue_gain = 0
+        frogs = self.red
+        while frogs:
+            low = frogs & -frogs
+            red_gain += (_ADJACENT[low.bit_length() - 1] & grown).bit_count()
+            frogs ^= low
+        frogs = self.blue
+        while frogs:
+            low = frogs & -frogs
+            blue_gain += (_ADJACENT[low.bit_length() - 1] & grown).bit_count()
+            frogs ^= low
+        self.red_pad_adj += scale * red_gain
+        self.blue_pad_adj += scale * blue_gain
+
+    def pseudo_mobility(self, player: PlayerColor) -> int:
+        # Cheap mobility count from mask shifts, without building actions:
+        # single steps plus single-hop jumps, plus one for GROW
+        own, dirs = (self.red, _RED_DIR_IDX) if player == PlayerColor.RED else (self.blue, _BLUE_DIR_IDX)
+        occupied = self.red | self.blue
+        free_pads = self.pads & ~occupied
+        count = 1
+        for d in dirs:
+            shift, sources = _SHIFT[d], _SHIFT_SOURCES[d]
+            if shift > 0:
+                step = (own & sources) << shift
+                hop = ((step & occupied & sources) << shift) & free_pads
+            else:
+                step = (own & sources) >> -shift
+                hop = ((step & occupied & sources) >> -shift) & free_pads
+            count += (step & free_pads).bit_count() + hop.bit_count()
+        return count
 
     def is_terminal(self):
         # Check if the game is over
-        red_goal = [f.r == 7 for f, p in self.frogs.items() if p == PlayerColor.RED]
-        blue_goal = [f.r == 0 for f, p in self.frogs.items() if p == PlayerColor.BLUE]
-        if len(red_goal) == 6 and all(red_goal):
-            return True
-        if len(blue_goal) == 6 and all(blue_goal):
+        if self.red_home == 6 or self.blue_home == 6:
             return True
         return self.turn >= self.MAX_TURNS
 
     def get_winner(self):
         # Determine the winner of the game
-        if all(f.r == 7 for f, p in self.frogs.items() if p == PlayerColor.RED):
+        if self.red & ~_ROW_MASKS[7] == 0:
             return PlayerColor.RED
-        if all(f.r == 0 for f, p in self.frogs.items() if p == PlayerColor.BLUE):
+        if self.blue & ~_ROW_MASKS[0] == 0:
             return PlayerColor.BLUE
-        red_count = sum(1 for f, p in self.frogs.items() if p == PlayerColor.RED and f.r == 7)
-        blue_count = sum(1 for f, p in self.frogs.items() if p == PlayerColor.BLUE and f.r == 0)
+        red_count = (self.red & _ROW_MASKS[7]).bit_count()
+        blue_count = (self.blue & _ROW_MASKS[0]).bit_count()
         if red_count > blue_count:
             return PlayerColor.RED
         if blue_count > red_count:
             return PlayerColor.BLUE
         return None
+
+
+# Score of a won game; any heuristic score is far smaller in magnitude
+WIN_SCORE = 1_000_000
+_INFINITY = 2 * WIN_SCORE
+
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the CPU budget for the turn is spent."""
+
+
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    Fixed-capacity transposition table of (depth, bound, value, best move key,
+    generation) entries, kept across turns. Each bucket has a depth-preferred
+    slot and an always-replace slot; entries from earlier searches (older
+    generations) lose their depth-preferred slot first.
+    """
+    BYTES_PER_SLOT = 320  # key, entry tuple, boxed value and move, once filled
+
+    def __init__(self, size_bits: int = 16):
+        self.size_bits = size_bits
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        # Drop every entry (two slots per bucket)
+        self._mask = (1 << self.size_bits) - 1
+        self._keys = [0] * (2 << self.size_bits)
+        self._entries = [None] * (2 << self.size_bits)
+
+    def resize(self, size_bits: int):
+        # Reallocate with a new capacity, dropping every entry
+        self.size_bits = size_bits
+        self.clear()
+
+    def new_search(self):
+        # Start a new generation; entries from earlier ones become replaceable
+        self.generation += 1
+
+    def probe(self, key: int):
+        # Return the (depth, flag, value, move, generation) entry stored for key, if any
+        slot = (key & self._mask) << 1
+        if self._keys[slot] == key:
+            return self._entries[slot]
+        if self._keys[slot + 1] == key:
+            return self._entries[slot + 1]
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: int, move: int | None):
+        # Keep the deeper search of this generation in the first slot; everything
+        # else overwrites the second
+        slot = (key & self._mask) << 1
+        entry = self._entries[slot]
+        if entry is None or self._keys[slot] == key or depth >= entry[0] or entry[4] != self.generation:
+            self._keys[slot] = key
+            self._entries[slot] = (depth, flag, value, move, self.generation)
+        else:
+            self._keys[slot + 1] = key
+            self._entries[slot + 1] = (depth, flag, value, move, self.generation)
+
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+
+class OpeningBook:
+    """
+    Read-only opening book: fixed-size records of (position key, move key),
+    sorted by position key, memory-mapped and binary-searched. Built offline
+    by agent/book.py; a missing or empty file is an empty book.
+    """
+    RECORD = struct.Struct("<QH")  # canonical_key(), move key in that frame
+
+    def __init__(self, path: str = BOOK_PATH):
+        self._map = None
+        self._size = 0
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size >= self.RECORD.size:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._size = len(self._map) // self.RECORD.size
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return self._size
+
+    def probe(self, key: int) -> int | None:
+        # Move key stored for a position key, or None
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            found, move = self.RECORD.unpack_from(self._map, mid * self.RECORD.size)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return move
+        return None
+
+
+class RaceSolver:
+    """
+    Exact solver for disengaged positions, where every red frog is at least two
+    rows past every blue frog. Neither side can then block, jump or use pads of
+    the other, so each side races alone: A* over (own frogs, pads still ahead
+    of them) finds its minimum number of turns to fill the goal row, with
+    h = frogs not yet home. Distances along each solved path are memoised, so
+    later turns of the same race are instant. Searches expanding more than
+    node_limit positions or running past their deadline give up (None); the
+    position is then remembered as failed, and no search is tried again for
+    retry_turns turns, when the race is shorter.
+    """
+    def __init__(self, node_limit: int = 20000, retry_turns: int = 6):
+        self.node_limit = node_limit
+        self.retry_turns = retry_turns
+        self._solved: dict[tuple[PlayerColor, int, int], tuple[int, int]] = {}
+        self._failed: set[tuple[PlayerColor, int, int]] = set()
+        self._retry_turn = {PlayerColor.RED: 0, PlayerColor.BLUE: 0}
+
+    @staticmethod
+    def disengaged(state: GameState) -> bool:
+        # Lowest red row at least two past the highest blue row
+        red_top = ((state.red & -state.red).bit_length() - 1) >> 3
+        blue_bottom = (state.blue.bit_length() - 1) >> 3
+        return red_top >= blue_bottom + 2
+
+    def solve(self, state: GameState, player: PlayerColor,
+              deadline: float = float("inf")) -> tuple[int, int] | None:
+        # (minimum turns to bring all of player's frogs home, move key of the first
+        # move of such a race) in a disengaged state, or None past the node limit
+        # or the deadline (process time), or while backing off after a failure
+        if player == PlayerColor.RED:
+            frogs, dirs, goal = state.red, _RED_DIR_IDX, _ROW_MASKS[7]
+        else:
+            frogs, dirs, goal = state.blue, _BLUE_DIR_IDX, _ROW_MASKS[0]
+        start = (frogs, _race_pads(player, frogs, state.pads))
+        if (player,) + start in self._solved:
+            return self._solved[(player,) + start]
+        if (player,) + start in self._failed or state.turn < self._retry_turn[player]:
+            return None
+
+        best = {start: 0}
+        parent = {start: None}
+        frontier = [((frogs & ~goal).bit_count(), 0, 0, start)]
+        pushed = expanded = 0
+        while frontier:
+            _, neg_g, _, node = heapq.heappop(frontier)
+            g = -neg_g
+            if g > best[node]:
+                continue
+            if node[0] & ~goal == 0:
+                return self._remember(player, node, g, parent)
+            expanded += 1
+            if len(best) > self.node_limit or (not expanded & 0x3F and time.process_time() > deadline):
+                self._failed.add((player,) + start)
+                self._retry_turn[player] = state.turn + self.retry_turns
+                return None
+            for key, new_frogs, new_pads in _race_moves(node[0], node[1], dirs):
+                child = (new_frogs, _race_pads(player, new_frogs, new_pads))
+                if g + 1 < best.get(child, g + 2):
+                    best[child] = g + 1
+                    parent[child] = (node, key)
+                    pushed += 1
+                    heapq.heappush(frontier, (g + 1 + (new_frogs & ~goal).bit_count(), -g - 1, pushed, child))
+        self._failed.add((player,) + start)
+        return None
+
+    def _remember(self, player, node, turns, parent) -> tuple[int, int]:
+        # Memoise the exact distance and next move of every position on the path
+        # to node; returns the entry for the path's start
+        entry = (0, _GROW_KEY)
+        while parent[node] is not None:
+            node, key = parent[node]
+            entry = (entry[0] + 1, key)
+            self._solved[(player,) + node] = entry
+        return entry
+
+
+class SearchStats:
+    """
+    Per-turn statistics of the agent: record() writes each turn as one JSON
+    line to a stream (stderr by default, None to stay silent) and finish()
+    adds a summary line over the game, once. If finish() is never called (the
+    opponent's move or the turn limit ended the game), the summary is written
+    when the process exits. Turns are tagged with their source: the opening
+    book, the race solver or a search.
+    """
+    def __init__(self, stream=sys.stderr):
+        self.stream = stream
+        self.turns: List[dict] = []
+        self._finished = False
+        atexit.register(self.finish)
+
+    def record(self, turn: dict):
+        self.turns.append(turn)
+        self._emit(turn)
+
+    def summary(self) -> dict:
+        # Totals over the game so far; rates are pooled over every searched turn
+        searches = [turn for turn in self.turns if turn["source"] == "search"]
+        total = {field: sum(turn[field] for turn in searches)
+                 for field in ("seconds", "nodes", "tt_probes", "tt_hits", "cutoffs", "first_move_cutoffs")}
+        depths = [turn["depth"] for turn in searches]
+        ebfs = [turn["ebf"] for turn in searches if turn["ebf"] is not None]
+        return {
+            "summary": True,
+            "turns": len(self.turns),
+            "book_turns": sum(turn["source"] == "book" for turn in self.turns),
+            "race_turns": sum(turn["source"] == "race" for turn in self.turns),
+            "searched_turns": len(searches),
+            "seconds": round(total["seconds"], 4),
+            "nodes": total["nodes"],
+            "nps": round(total["nodes"] / total["seconds"]) if total["seconds"] > 0 else 0,
+            "min_depth": min(depths, default=0),
+            "mean_depth": _rate(sum(depths), len(depths)),
+            "mean_ebf": _rate(sum(ebfs), len(ebfs)),
+            "tt_hit_rate": _rate(total["tt_hits"], total["tt_probes"]),
+            "first_move_cutoff_rate": _rate(total["first_move_cutoffs"], total["cutoffs"]),
+        }
+
+    def finish(self):
+        # Write the game summary, unless it has been written or there is nothing to sum up
+        if self._finished or not self.turns:
+            return
+        self._finished = True
+        self._emit(self.summary())
+
+    def _emit(self, line: dict):
+        if self.stream is not None:
+            print(json.dumps(line), file=self.stream, flush=True)
+
+
+def _rate(part: float, whole: float) -> float | None:
+    # part / whole to three decimal places, or None when whole is 0
+    return round(part / whole, 3) if whole else None
+
+
+def _bound(value: int, alpha: int, beta: int) -> int:
+    # Bound type of a search result relative to the window it was searched with
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+
+# Precomputed board geometry shared by every GameState, on top of the
+# referee's geometry tables. Squares are indexed r * 8 + c, directions by their
+# position in list(Direction).
+_DIRS = list(DIRECTIONS)
+_DIR_INDEX = DIRECTION_INDEX
+_COORDS = CELLS
+_ROW_MASKS = [0xFF << (8 * r) for r in range(8)]
+_COL_MASKS = [sum(1 << (8 * r + c) for r in range(8)) for c in range(8)]
+_INNER_COLS = ~(_COL_MASKS[0] | _COL_MASKS[7]) & ((1 << 64) - 1)
+
+# _STEP[d][sq] is the square one step from sq in direction d, or -1 off the board
+_STEP = [[NEIGHBOURS[sq][d] for sq in range(64)] for d in range(8)]
+_ADJACENT = [sum(1 << _STEP[d][sq] for d in range(8) if _STEP[d][sq] >= 0) for sq in range(64)]
+
+# Whole-mask steps: shifting (mask & _SHIFT_SOURCES[d]) by _SHIFT[d] moves every
+# square one step in direction d; the source mask drops squares that would leave the board
+_SHIFT = [8 * dr + dc for dr, dc in DIRECTION_VECTORS]
+_SHIFT_SOURCES = [sum(1 << sq for sq in range(64) if _STEP[d][sq] >= 0) for d in range(8)]
+_RED_DIR_IDX = [_DIR_INDEX[d] for d in GameState.RED_DIRS]
+_BLUE_DIR_IDX = [_DIR_INDEX[d] for d in GameState.BLUE_DIRS]
+_FORWARD = [dr for dr, _ in DIRECTION_VECTORS]
+_LATERAL = [abs(dc) for _, dc in DIRECTION_VECTORS]
+
+# Move keys are from_square << 6 | to_square; GROW is 0 (no move starts and ends on 0).
+# Quiet moves (steps and GROW) are the ones killer and history tables track.
+_GROW_KEY = 0
+_QUIET = [key == _GROW_KEY or max(abs((key >> 6) // 8 - (key & 63) // 8),
+                                  abs((key >> 6) % 8 - (key & 63) % 8)) == 1
+          for key in range(4096)]
+_LATERAL_STEP = [_QUIET[key] and key != _GROW_KEY and (key >> 6) // 8 == (key & 63) // 8
+                 for key in range(4096)]
+
+# Left-right mirror image (c -> 7 - c) of each square, and of each move key
+_MIRROR = [sq ^ 7 for sq in range(64)]
+_MIRROR_MOVE = [_GROW_KEY if key == _GROW_KEY else _MIRROR[key >> 6] << 6 | _MIRROR[key & 63]
+                for key in range(4096)]
+
+# Zobrist keys (63-bit, fixed seed so keys agree between processes and runs).
+# Each cell's entry pairs its own key (low 64 bits) with its mirror square's
+# key (high 64 bits), so the XORs that maintain GameState.key keep the keys of
+# the position and of its mirror image at once.
+_ZOBRIST_RNG = random.Random(30024)
+_KEY_MASK = (1 << 64) - 1
+
+
+def _paired_keys() -> List[int]:
+    keys = [_ZOBRIST_RNG.getrandbits(63) for _ in range(64)]
+    return [keys[sq] | keys[_MIRROR[sq]] << 64 for sq in range(64)]
+
+
+_ZOBRIST_PAD = _paired_keys()
+_ZOBRIST_RED = _paired_keys()
+_ZOBRIST_BLUE = _paired_keys()
+_ZOBRIST_BLUE_TO_MOVE = _ZOBRIST_RNG.getrandbits(63)
+
+
+def _mask_of(coords) -> int:
+    # Bit mask of a collection of coordinates
+    mask = 0
+    for pos in coords:
+        mask |= 1 << (pos.r * 8 + pos.c)
+    return mask
+
+
+def _cells_key(table: List[int], mask: int) -> int:
+    # XOR of the Zobrist keys of every square set in a mask
+    key = 0
+    while mask:
+        low = mask & -mask
+        key ^= table[low.bit_length() - 1]
+        mask ^= low
+    return key
+
+
+def _board_key(pads: int, red: int, blue: int) -> int:
+    # Zobrist key of a whole board, computed from scratch
+    return _cells_key(_ZOBRIST_PAD, pads) ^ _cells_key(_ZOBRIST_RED, red) ^ _cells_key(_ZOBRIST_BLUE, blue)
+
+
+def _mirror_mask(mask: int) -> int:
+    # A mask reflected left-right
+    mirrored = 0
+    for sq in _squares(mask):
+        mirrored |= 1 << _MIRROR[sq]
+    return mirrored
+
+
+def mirror_move(key: int) -> int:
+    # A move key reflected left-right
+    return _MIRROR_MOVE[key]
+
+
+def _squares(mask: int):
+    # Yield the square indices set in a mask, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _race_pads(player: PlayerColor, frogs: int, pads: int) -> int:
+    # The pads a racing side can still use: rows from its rearmost frog onwards
+    if player == PlayerColor.RED:
+        return pads & ~((1 << (((frogs & -frogs).bit_length() - 1) & ~7)) - 1)
+    return pads & ((1 << (((frogs.bit_length() - 1) | 7) + 1)) - 1)
+
+
+def _race_moves(frogs: int, pads: int, dirs) -> list[tuple[int, int, int]]:
+    # (move key, frogs, pads) after each move and useful GROW of a side with no
+    # opponent in reach: steps, jumps (over its own frogs) and GROW
+    free_pads = pads & ~frogs
+    moves = []
+    for start in _squares(frogs):
+        targets = 0
+        for d in dirs:
+            dst = _STEP[d][start]
+            if dst >= 0 and free_pads >> dst & 1:
+                targets |= 1 << dst
+        targets |= _jump_landings(dirs, frogs, free_pads, start)
+        rest, consumed = frogs ^ (1 << start), pads & ~(1 << start)
+        for dst in _squares(targets):
+            moves.append((start << 6 | dst, rest | 1 << dst, consumed))
+    grown = 0
+    for sq in _squares(frogs):
+        grown |= _ADJACENT[sq]
+    grown &= ~pads & ~frogs
+    if grown:
+        moves.append((_GROW_KEY, frogs, pads | grown))
+    return moves
+
+
+def _jump_landings(dirs, occupied, free_pads, start) -> int:
+    # Mask of the free pads the frog on start can reach by a chain of jumps.
+    # As in the referee, a chain may pass through any unoccupied cell; only
+    # the final landing has to be a pad.
+    reached = 0
+    frontier = 1 << start
+    while frontier:
+        new = 0
+        for d in dirs:
+            shift, sources = _SHIFT[d], _SHIFT_SOURCES[d]
+            if shift > 0:
+                new |= ((((frontier & sources) << shift) & occupied & sources) << shift) & ~occupied
+            else:
+                new |= ((((frontier & sources) >> -shift) & occupied & sources) >> -shift) & ~occupied
+        frontier = new & ~reached
+        reached |= frontier
+    return reached & free_pads
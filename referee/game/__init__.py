@@ -11,6 +11,7 @@ from .player import Player
 from .board import Board, PlayerColor
 from .actions import Action, MoveAction, GrowAction
 from .exceptions import PlayerException, IllegalActionException
+from .notation import format_position, parse_position, pack_position, unpack_position
 
 
 # Here we define the ADT for all possible game updates. This is a useful
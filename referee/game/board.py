@@ -2,12 +2,14 @@
 # Project Part B: Game Playing Agent
 
 from dataclasses import dataclass
-from typing import Literal
+from typing import Iterator, Literal
 
 from .coord import Coord, Direction
 from .player import PlayerColor
 from .actions import Action, MoveAction, GrowAction
 from .exceptions import IllegalActionException
+from .geometry import CELLS, DIRECTIONS, DIRECTION_INDEX, NEIGHBOURS, JUMP_LANDINGS, ADJACENT, cell_index
+from .notation import Position, format_position, parse_position, pack_position, unpack_position
 from .constants import *
 
 
@@ -44,6 +46,29 @@ class CellState:
         yield self.state
 
 
+# The four possible cell states, interned: a Board stores each cell as an index
+# into CELL_STATES (EMPTY, LILY_PAD, RED or BLUE below) and hands out these
+# shared instances rather than allocating a CellState per cell or mutation.
+EMPTY, LILY_PAD, RED, BLUE = range(4)
+CELL_STATES: tuple[CellState, ...] = (
+    CellState(None),
+    CellState("LilyPad"),
+    CellState(PlayerColor.RED),
+    CellState(PlayerColor.BLUE),
+)
+_CELL_CODES = {cell.state: code for code, cell in enumerate(CELL_STATES)}
+_COLOR_CODES = {PlayerColor.RED: RED, PlayerColor.BLUE: BLUE}
+# Goal (final) row of each cell code's frogs, -1 for codes without frogs
+_GOAL_ROWS = (-1, -1, BOARD_N - 1, 0)
+# Indices (into DIRECTIONS) of the directions each colour may move in
+_LEGAL_DIRECTIONS = {
+    PlayerColor.RED: tuple(
+        d for d, direction in enumerate(DIRECTIONS) if direction not in ILLEGAL_RED_DIRECTIONS),
+    PlayerColor.BLUE: tuple(
+        d for d, direction in enumerate(DIRECTIONS) if direction not in ILLEGAL_BLUE_DIRECTIONS),
+}
+
+
 @dataclass(frozen=True, slots=True)
 class CellMutation:
     """
@@ -62,10 +87,19 @@ class CellMutation:
 class BoardMutation:
     """
     A structure representing a change in the state of the game board after an
-    action has been played. Each mutation consists of a set of cell mutations.
+    action has been played. The changes are stored compactly as (cell index,
+    previous cell code, next cell code) triples, which the board applies and
+    undoes directly; `cell_mutations` presents them as a set of cell mutations.
     """
     action: Action
-    cell_mutations: set[CellMutation]
+    cell_codes: tuple[tuple[int, int, int], ...]
+
+    @property
+    def cell_mutations(self) -> set[CellMutation]:
+        return {
+            CellMutation(CELLS[index], CELL_STATES[prev], CELL_STATES[code])
+            for index, prev, code in self.cell_codes
+        }
 
     def __str__(self):
         return f"BoardMutation({self.cell_mutations})"
@@ -83,34 +117,109 @@ class Board:
     def __init__(
         self, 
         initial_state: dict[Coord, CellState] = {},
-        initial_player: PlayerColor = PlayerColor.RED
+        initial_player: PlayerColor = PlayerColor.RED,
+        initial_turn: int = 0
     ):
         """
         Create a new board. It is optionally possible to specify an initial
-        board state (in practice this is only used for testing).
+        board state and turn count (in practice this is only used for testing
+        and for boards restored with `from_notation`/`unpack`).
         """
-        self._state: dict[Coord, CellState] = {
-            Coord(r, c): CellState() 
-            for r in range(BOARD_N) 
-            for c in range(BOARD_N)
-        }
-        self._state.update(initial_state)
+        # Cell codes (indices into CELL_STATES), indexed by r * BOARD_N + c
+        self._cells = bytearray(BOARD_N * BOARD_N)
+        for coord, cell in initial_state.items():
+            self._cells[cell_index(coord)] = _CELL_CODES[cell.state]
 
         if not initial_state:
             for r in [0, BOARD_N - 1]:
                 for c in [0, BOARD_N - 1]:
-                    self._state[Coord(r, c)] = CellState("LilyPad")
+                    self._cells[r * BOARD_N + c] = LILY_PAD
 
             for r in [1, BOARD_N - 2]:
                 for c in range(1, BOARD_N - 1):
-                    self._state[Coord(r, c)] = CellState("LilyPad")
+                    self._cells[r * BOARD_N + c] = LILY_PAD
                 
             for c in range(1, BOARD_N - 1):
-                self._state[Coord(0, c)] = CellState(PlayerColor.RED)
-                self._state[Coord(BOARD_N - 1, c)] = CellState(PlayerColor.BLUE)
+                self._cells[c] = RED
+                self._cells[(BOARD_N - 1) * BOARD_N + c] = BLUE
+
+        # Frogs of each colour, and those of them in their goal row, indexed
+        # by cell code and kept up to date as cells change
+        self._frog_counts = [0] * len(CELL_STATES)
+        self._goal_counts = [0] * len(CELL_STATES)
+        for index, code in enumerate(self._cells):
+            self._count_cell(index, code, 1)
 
         self._turn_color: PlayerColor = initial_player
+        self._initial_turn: int = initial_turn
         self._history: list[BoardMutation] = []
+        # Moves handed out by the legal-action generators for the current
+        # position, (coord, directions) -> destination index. Replaced (not
+        # cleared) whenever the board changes: a generator records only into
+        # the dict it started with and stops once that is no longer current,
+        # so moves of an old position never reach the new one's.
+        self._legal_moves: dict[tuple[Coord, tuple[Direction, ...]], int] = {}
+
+    @classmethod
+    def from_position(cls, position: Position) -> "Board":
+        """
+        Create a board from a (pads, red, blue, colour to move, turn count)
+        tuple of cell masks, as used by `referee.game.notation`.
+        """
+        pads, red, blue, turn_color, turn = position
+        initial_state = {}
+        for index, cell in enumerate(CELLS):
+            bit = 1 << index
+            if red & bit:
+                initial_state[cell] = CELL_STATES[RED]
+            elif blue & bit:
+                initial_state[cell] = CELL_STATES[BLUE]
+            elif pads & bit:
+                initial_state[cell] = CELL_STATES[LILY_PAD]
+        return cls(initial_state, turn_color, turn)
+
+    @classmethod
+    def from_notation(cls, text: str) -> "Board":
+        """
+        Create a board from its text notation (see `format_position`).
+        """
+        return cls.from_position(parse_position(text))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "Board":
+        """
+        Create a board from its 16-byte packing (see `pack_position`).
+        """
+        return cls.from_position(unpack_position(data))
+
+    def position(self) -> Position:
+        """
+        The board as a (pads, red, blue, colour to move, turn count) tuple of
+        cell masks, with every frog's cell counted as a lily pad.
+        """
+        pads = red = blue = 0
+        for index, code in enumerate(self._cells):
+            if code == EMPTY:
+                continue
+            bit = 1 << index
+            pads |= bit
+            if code == RED:
+                red |= bit
+            elif code == BLUE:
+                blue |= bit
+        return pads, red, blue, self._turn_color, self.turn_count
+
+    def to_notation(self) -> str:
+        """
+        The text notation of the board (see `format_position`).
+        """
+        return format_position(*self.position())
+
+    def pack(self) -> bytes:
+        """
+        The 16-byte packing of the board (see `pack_position`).
+        """
+        return pack_position(*self.position())
 
     def __getitem__(self, cell: Coord) -> CellState:
         """
@@ -118,7 +227,7 @@ class Board:
         """
         if not self._within_bounds(cell):
             raise IndexError(f"Cell position '{cell}' is invalid.")
-        return self._state[cell]
+        return CELL_STATES[self._cells[cell_index(cell)]]
 
     def apply_action(self, action: Action) -> BoardMutation:
         """
@@ -134,11 +243,16 @@ class Board:
                 raise IllegalActionException(
                     f"Unknown action {action}", self._turn_color)
 
-        for cell_mutation in mutation.cell_mutations:
-            self._state[cell_mutation.cell] = cell_mutation.next
+        cells = self._cells
+        for index, prev, code in mutation.cell_codes:
+            cells[index] = code
+            if prev >= RED or code >= RED:
+                self._count_cell(index, prev, -1)
+                self._count_cell(index, code, 1)
         
         self._history.append(mutation)
         self._turn_color = self._turn_color.opponent
+        self._legal_moves = {}
 
         return mutation
 
@@ -153,12 +267,79 @@ class Board:
         mutation: BoardMutation = self._history.pop()
 
         self._turn_color = self._turn_color.opponent
+        self._legal_moves = {}
 
-        for cell_mutation in mutation.cell_mutations:
-            self._state[cell_mutation.cell] = cell_mutation.prev
+        cells = self._cells
+        for index, prev, code in mutation.cell_codes:
+            cells[index] = prev
+            if prev >= RED or code >= RED:
+                self._count_cell(index, code, -1)
+                self._count_cell(index, prev, 1)
 
         return mutation
 
+    def iter_legal_actions(self) -> Iterator[Action]:
+        """
+        Generate the legal actions of the player to move: one MOVE per distinct
+        (frog, destination) pair, then GROW. Jump chains are the shortest ones
+        reaching each landing cell. The moves generated are remembered, so
+        applying one of them skips re-validation. The generator stops early if
+        the board changes before it is exhausted.
+        """
+        legal_moves = self._legal_moves
+        color = self._turn_color
+        color_code = _COLOR_CODES[color]
+        frogs, remaining = [], self._frog_counts[color_code]
+        for index, code in enumerate(self._cells):
+            if remaining == 0:
+                break
+            if code == color_code:
+                frogs.append(index)
+                remaining -= 1
+
+        for index in frogs:
+            for action in self._iter_frog_moves(index, color, legal_moves):
+                if self._legal_moves is not legal_moves:
+                    return
+                yield action
+        if self._legal_moves is legal_moves:
+            yield GrowAction()
+
+    def legal_actions(self) -> list[Action]:
+        """
+        The legal actions of the player to move (see `iter_legal_actions`).
+        """
+        return list(self.iter_legal_actions())
+
+    def legal_actions_from(self, coord: Coord) -> list[MoveAction]:
+        """
+        The legal MOVE actions of the frog at a cell, which must belong to the
+        player to move (otherwise there are none).
+        """
+        if not self._within_bounds(coord) or \
+                self._cell_code(coord) != _COLOR_CODES[self._turn_color]:
+            return []
+        return list(self._iter_frog_moves(cell_index(coord), self._turn_color, self._legal_moves))
+
+    def is_legal_action(self, action: Action) -> bool:
+        """
+        True iff the action could be applied to the board. Constant time for
+        actions produced by the legal-action generators since the last change.
+        """
+        if self._generated_destination(action) is not None:
+            return True
+        try:
+            match action:
+                case MoveAction():
+                    self._validate_move_action(action)
+                case GrowAction():
+                    pass
+                case _:
+                    return False
+        except IllegalActionException:
+            return False
+        return True
+
     def render(self, use_color: bool=False, use_unicode: bool=False) -> str:
         """
         Returns a visualisation of the game board as a multiline string, with
@@ -178,8 +359,9 @@ class Board:
         output = ""
         for r in range(BOARD_N):
             for c in range(BOARD_N):
-                if self._cell_occupied(Coord(r, c)):
-                    state = self._state[Coord(r, c)].state
+                code = self._cells[r * BOARD_N + c]
+                if code != EMPTY:
+                    state = CELL_STATES[code].state
                     if state == "LilyPad":
                         text = "*"
                     elif state == PlayerColor.RED or state == PlayerColor.BLUE:
@@ -202,7 +384,7 @@ class Board:
         """
         The number of actions that have been played so far.
         """
-        return len(self._history)
+        return self._initial_turn + len(self._history)
     
     @property
     def turn_limit_reached(self) -> bool:
@@ -227,8 +409,8 @@ class Board:
             return True
 
         # If a player's tokens are all in the final row, the game is over.
-        if self._player_score(PlayerColor.RED) == BOARD_N - 2 or \
-           self._player_score(PlayerColor.BLUE) == BOARD_N - 2:
+        if self._goal_counts[RED] == BOARD_N - 2 or \
+           self._goal_counts[BLUE] == BOARD_N - 2:
             return True
 
         return False
@@ -241,8 +423,8 @@ class Board:
         if not self.game_over:
             return None
         
-        red_score = self._player_score(PlayerColor.RED)
-        blue_score = self._player_score(PlayerColor.BLUE)
+        red_score = self._goal_counts[RED]
+        blue_score = self._goal_counts[BLUE]
         if red_score > blue_score:
             return PlayerColor.RED
         elif blue_score > red_score:
@@ -252,29 +434,35 @@ class Board:
         r, c = coord
         return 0 <= r < BOARD_N and 0 <= c < BOARD_N
     
+    def _cell_code(self, coord: Coord) -> int:
+        return self._cells[cell_index(coord)]
+
     def _cell_occupied(self, coord: Coord) -> bool:
-        return self._state[coord].state != None
+        return self._cell_code(coord) != EMPTY
     
     def _cell_empty(self, coord: Coord) -> bool:
-        return self._state[coord].state == None
+        return self._cell_code(coord) == EMPTY
     
     def _row_count(self, color: PlayerColor, row: int) -> int:
-        return sum(
-            (1 if self._state[Coord(row, c)].state == color else 0)
-            for c in range(BOARD_N)
-        )
+        return self._cells.count(_COLOR_CODES[color], row * BOARD_N, (row + 1) * BOARD_N)
     
     def _player_score(self, color: PlayerColor) -> int:
-        return {
-            PlayerColor.RED: self._row_count(PlayerColor.RED, BOARD_N - 1),
-            PlayerColor.BLUE: self._row_count(PlayerColor.BLUE, 0)
-        }[color]
+        return self._goal_counts[_COLOR_CODES[color]]
+
+    def _count_cell(self, index: int, code: int, delta: int):
+        # Add (or with delta -1, remove) a cell's code to the frog counts
+        if code >= RED:
+            self._frog_counts[code] += delta
+            if index // BOARD_N == _GOAL_ROWS[code]:
+                self._goal_counts[code] += delta
     
     def _cell_occupied_by_player(self, coord: Coord) -> bool:
-        return self._state[coord].state in [PlayerColor.RED, PlayerColor.BLUE]
+        return self._cell_code(coord) >= RED
     
     def _occupied_coords(self) -> set[Coord]:
-        return set(filter(self._cell_occupied, self._state.keys()))
+        return set(
+            CELLS[index] for index, code in enumerate(self._cells) if code != EMPTY
+        )
     
     def _assert_coord_valid(self, coord: Coord):
         if type(coord) != Coord or not self._within_bounds(coord):
@@ -282,7 +470,7 @@ class Board:
                 f"'{coord}' is not a valid coordinate.", self._turn_color)
         
     def _assert_coord_occ_by(self, coord: Coord, color: PlayerColor):
-        if self._cell_empty(coord) or self._state[coord].state != color:
+        if self._cell_code(coord) != _COLOR_CODES[color]:
             raise IllegalActionException(
                 f"Coord {coord} is not occupied by player {color}.", 
                     self._turn_color)
@@ -312,55 +500,106 @@ class Board:
                 )
         
     def _has_neighbour(self, coord: Coord, color: PlayerColor) -> bool:
-        for direction in Direction:
-            try:
-                neighbour = coord + direction
-                if self._state[neighbour].state == color:
-                    return True
-            except ValueError:
-                pass
+        color_code = _COLOR_CODES[color]
+        for neighbour in ADJACENT[cell_index(coord)]:
+            if self._cells[neighbour] == color_code:
+                return True
         return False
         
+    def _iter_frog_moves(
+        self,
+        index: int,
+        color: PlayerColor,
+        legal_moves: dict[tuple[Coord, tuple[Direction, ...]], int]
+    ) -> Iterator[MoveAction]:
+        # Steps onto adjacent lily pads, then jump chains in breadth-first
+        # order, for color's frog on index; each move is recorded in
+        # legal_moves before it is yielded. As in `_resolve_move_destination`,
+        # a chain may pass through any unoccupied cell but must end on a lily pad.
+        cells = self._cells
+        directions = _LEGAL_DIRECTIONS[color]
+        coord = CELLS[index]
+
+        for d in directions:
+            step = NEIGHBOURS[index][d]
+            if step >= 0 and cells[step] == LILY_PAD:
+                path = (DIRECTIONS[d],)
+                legal_moves[coord, path] = step
+                yield MoveAction(coord, path)
+
+        paths = {index: ()}
+        frontier = [index]
+        while frontier:
+            landings = []
+            for curr in frontier:
+                for d in directions:
+                    over, land = NEIGHBOURS[curr][d], JUMP_LANDINGS[curr][d]
+                    if land < 0 or cells[over] < RED or cells[land] >= RED \
+                            or land in paths:
+                        continue
+                    path = paths[curr] + (DIRECTIONS[d],)
+                    paths[land] = path
+                    landings.append(land)
+                    if cells[land] == LILY_PAD:
+                        legal_moves[coord, path] = land
+                        yield MoveAction(coord, path)
+            frontier = landings
+
+    def _generated_destination(self, action: Action) -> int | None:
+        # Destination index of a move handed out for the current position by
+        # the legal-action generators, or None
+        if type(action) != MoveAction or type(action.directions) != tuple:
+            return None
+        try:
+            return self._legal_moves.get((action.coord, action.directions))
+        except TypeError:
+            return None
+
     def _resolve_move_destination(self, move_action: MoveAction) -> Coord:
-        curr_coord = move_action.coord
+        return CELLS[self._resolve_move_index(move_action)]
+
+    def _resolve_move_index(self, move_action: MoveAction) -> int:
+        # Index of the cell a move lands on, walking its path once
+        cells = self._cells
+        curr = cell_index(move_action.coord)
 
         # Regular move to directly adjacent cell
-        try:
-            if len(move_action.directions) == 1 and \
-                not self._cell_occupied_by_player(
-                    curr_coord + move_action.directions[0]
-                ):
-                curr_coord += move_action.directions[0]
-                return curr_coord
-        except ValueError:
-            raise IllegalActionException(
-                f"Move action {move_action.coord} {move_action.directions} "
-                "is prohibited.", self._turn_color)
+        if len(move_action.directions) == 1:
+            step = NEIGHBOURS[curr][DIRECTION_INDEX[move_action.directions[0]]]
+            if step < 0:
+                raise IllegalActionException(
+                    f"Move action {move_action.coord} {move_action.directions} "
+                    "is prohibited.", self._turn_color)
+            if cells[step] < RED:
+                return step
 
         # If we reach this point, we expect one or more jumps
         for direction in move_action.directions:
-            try:
-                curr_coord += direction
-                if not self._cell_occupied_by_player(curr_coord):
-                    raise IllegalActionException(
-                        f"Jump {move_action.coord} {move_action.directions} "
-                        "over unoccupied cell is prohibited.", 
-                        self._turn_color)
-                
-                curr_coord += direction
-                if self._cell_occupied_by_player(curr_coord):
-                    raise IllegalActionException(
-                        f"Jump {move_action.coord} {move_action.directions} "
-                        "is blocked.", self._turn_color)
-                
-            except ValueError:
+            d = DIRECTION_INDEX[direction]
+            over, land = NEIGHBOURS[curr][d], JUMP_LANDINGS[curr][d]
+            if over < 0:
                 raise IllegalActionException(
                     f"Move {move_action.coord} {move_action.directions} "
                     "is prohibited.", self._turn_color)
+            if cells[over] < RED:
+                raise IllegalActionException(
+                    f"Jump {move_action.coord} {move_action.directions} "
+                    "over unoccupied cell is prohibited.", 
+                    self._turn_color)
+            if land < 0:
+                raise IllegalActionException(
+                    f"Move {move_action.coord} {move_action.directions} "
+                    "is prohibited.", self._turn_color)
+            if cells[land] >= RED:
+                raise IllegalActionException(
+                    f"Jump {move_action.coord} {move_action.directions} "
+                    "is blocked.", self._turn_color)
+            curr = land
                 
-        return curr_coord
+        return curr
 
-    def _validate_move_action(self, action: MoveAction):
+    def _validate_move_action(self, action: MoveAction) -> int:
+        # Returns the index of the destination cell
         if type(action) != MoveAction:
             raise IllegalActionException(
                 f"Action '{action}' is not a MOVE action object.", 
@@ -387,72 +626,47 @@ class Board:
             self._assert_direction_valid(direction)
             self._assert_direction_legal(direction, self._turn_color)
 
-        dest_coord = self._resolve_move_destination(action)
+        dest = self._resolve_move_index(action)
         
-        if self._state[dest_coord].state != "LilyPad":
+        if self._cells[dest] != LILY_PAD:
             raise IllegalActionException(
                 f"Move {action.coord} {action.directions} "
                 "is prohibited.", self._turn_color)
+        return dest
 
     def _resolve_move_action(self, action: MoveAction) -> BoardMutation:
-        self._validate_move_action(action)
+        dest = self._generated_destination(action)
+        if dest is None:
+            dest = self._validate_move_action(action)
 
         # Ensure action directions object is immutable
-        action = MoveAction(action.coord, tuple(action.directions))
-
-        from_coord = action.coord
-        dest_coord = self._resolve_move_destination(action)
-
-        cell_mutations = {
-            from_coord: CellMutation(
-                from_coord,
-                self._state[from_coord],
-                CellState(None)
-            ),
-            dest_coord: CellMutation(
-                dest_coord,
-                self._state[dest_coord],
-                self._state[from_coord]
-            )
-        }
+        if type(action._directions) != tuple:
+            action = MoveAction(action.coord, tuple(action.directions))
 
-        return BoardMutation(
-            action,
-            cell_mutations=set(cell_mutations.values())
-        )
+        source = cell_index(action.coord)
+        code = self._cells[source]
+        return BoardMutation(action, ((source, code, EMPTY), (dest, LILY_PAD, code)))
     
     def _resolve_grow_action(self, action: GrowAction) -> BoardMutation:
-        cell_mutations = {}
-
-        player_cells = set(
-            coord for coord, cell in self._state.items()
-            if cell.state == self._turn_color
-        )
-
-        neighbour_cells = set()
-        for cell in player_cells:
-            for direction in Direction:
-                try:
-                    neighbour = cell + direction
-                    neighbour_cells.add(neighbour)
-                except ValueError:
-                    pass
-
-        for cell in neighbour_cells:
-            if self._cell_empty(cell):
-                cell_mutations[cell] = CellMutation(
-                    cell,
-                    self._state[cell],
-                    CellState('LilyPad')
-                )
+        cells = self._cells
+        color_code = _COLOR_CODES[self._turn_color]
+        grown = set()
+        for index, code in enumerate(cells):
+            if code == color_code:
+                for neighbour in ADJACENT[index]:
+                    if cells[neighbour] == EMPTY:
+                        grown.add(neighbour)
 
         return BoardMutation(
-            action,
-            cell_mutations=set(cell_mutations.values())
-        )
+            action, tuple((index, EMPTY, LILY_PAD) for index in sorted(grown)))
     
     def set_cell_state(self, cell: Coord, state: CellState):
-        self._state[cell] = state
+        index = cell_index(cell)
+        self._count_cell(index, self._cells[index], -1)
+        self._cells[index] = _CELL_CODES[state.state]
+        self._count_cell(index, self._cells[index], 1)
+        self._legal_moves = {}
 
     def set_turn_color(self, color: PlayerColor):
         self._turn_color = color
+        self._legal_moves = {}
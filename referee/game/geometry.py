@@ -0,0 +1,46 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+from .coord import Coord, Direction
+from .constants import BOARD_N
+
+
+# Precomputed board geometry. Cells are indexed r * BOARD_N + c and directions
+# by their position in DIRECTIONS, so hot loops can walk the board with table
+# lookups instead of building (and bounds-checking) Coord instances. Off-board
+# steps are -1 in the tables.
+
+DIRECTIONS: tuple[Direction, ...] = tuple(Direction)
+DIRECTION_INDEX: dict[Direction, int] = {d: i for i, d in enumerate(DIRECTIONS)}
+# (dr, dc) of each direction, read once rather than through Direction.__getattribute__
+DIRECTION_VECTORS: tuple[tuple[int, int], ...] = tuple((d.value.r, d.value.c) for d in DIRECTIONS)
+
+# One interned Coord per cell
+CELLS: tuple[Coord, ...] = tuple(Coord(r, c) for r in range(BOARD_N) for c in range(BOARD_N))
+
+
+def _offset(index: int, d: int, n: int) -> int:
+    # Index of the cell n steps from index in direction d, or -1 off the board
+    r = index // BOARD_N + n * DIRECTION_VECTORS[d][0]
+    c = index % BOARD_N + n * DIRECTION_VECTORS[d][1]
+    return r * BOARD_N + c if 0 <= r < BOARD_N and 0 <= c < BOARD_N else -1
+
+
+# NEIGHBOURS[index][d]: the adjacent cell in direction d (the cell jumped over)
+NEIGHBOURS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(_offset(index, d, 1) for d in range(len(DIRECTIONS))) for index in range(len(CELLS)))
+
+# JUMP_LANDINGS[index][d]: the cell two steps away in direction d (where a jump lands)
+JUMP_LANDINGS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(_offset(index, d, 2) for d in range(len(DIRECTIONS))) for index in range(len(CELLS)))
+
+# ADJACENT[index]: every on-board neighbour of a cell
+ADJACENT: tuple[tuple[int, ...], ...] = tuple(
+    tuple(n for n in NEIGHBOURS[index] if n >= 0) for index in range(len(CELLS)))
+
+
+def cell_index(coord: Coord) -> int:
+    """
+    Index of a coordinate in CELLS and the geometry tables.
+    """
+    return coord.r * BOARD_N + coord.c
@@ -0,0 +1,185 @@
+# COMP30024 Artificial Intelligence, Semester 1 2025
+# Project Part B: Game Playing Agent
+
+from math import comb
+
+from .player import PlayerColor
+from .constants import *
+
+
+# A position is exchanged as a tuple of 64-bit masks (bit r * BOARD_N + c):
+#   (lily pads, red frogs, blue frogs, colour to move, turn count)
+# where every frog also stands on a lily pad.
+Position = tuple[int, int, int, PlayerColor, int]
+
+FROGS_PER_PLAYER = BOARD_N - 2
+PACKED_SIZE = 16
+
+_CELLS = BOARD_N * BOARD_N
+_RED_RANK_BITS = (comb(_CELLS, FROGS_PER_PLAYER) - 1).bit_length()
+_BLUE_RANK_BITS = (comb(_CELLS - FROGS_PER_PLAYER, FROGS_PER_PLAYER) - 1).bit_length()
+_TURN_BITS = 8
+# _COMB[n][k] = n choose k, for ranking frog sets
+_COMB = [[comb(n, k) for k in range(FROGS_PER_PLAYER + 1)] for n in range(_CELLS + 1)]
+_COLOR_CODES = {PlayerColor.RED: "r", PlayerColor.BLUE: "b"}
+_CODE_COLORS = {code: color for color, code in _COLOR_CODES.items()}
+
+
+def format_position(pads: int, red: int, blue: int, turn_color: PlayerColor, turn: int) -> str:
+    """
+    Text notation of a position, modelled on chess FEN: the rows from row 0,
+    separated by "/", with "R"/"B" for frogs, "*" for lily pads and a digit
+    for each run of empty cells, then the colour to move ("r"/"b") and the
+    turn count. The initial position is
+    "*RRRRRR*/1******1/8/8/8/8/1******1/*BBBBBB* r 0".
+    """
+    rows = []
+    for r in range(BOARD_N):
+        row, empty = "", 0
+        for c in range(BOARD_N):
+            bit = 1 << (r * BOARD_N + c)
+            if not (pads | red | blue) & bit:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += "R" if red & bit else "B" if blue & bit else "*"
+        rows.append(row + str(empty) if empty else row)
+    return f"{'/'.join(rows)} {_COLOR_CODES[turn_color]} {turn}"
+
+
+def parse_position(text: str) -> Position:
+    """
+    Parse the notation written by `format_position`. The colour to move and
+    the turn count may be left out (RED to move, turn 0). Raises ValueError
+    if the text is not a valid position, including rows that split a run of
+    empty cells over several digits or use "0".
+    """
+    fields = text.split()
+    if not 1 <= len(fields) <= 3:
+        raise ValueError(f"Position '{text}' should have 1 to 3 fields.")
+    rows = fields[0].split("/")
+    if len(rows) != BOARD_N:
+        raise ValueError(f"Position '{text}' should have {BOARD_N} rows.")
+
+    pads = red = blue = 0
+    for r, row in enumerate(rows):
+        c = 0
+        for i, char in enumerate(row):
+            if char.isdigit():
+                # Runs of empty cells are written as one non-zero digit, so
+                # every position has exactly one notation
+                if char == "0" or i > 0 and row[i - 1].isdigit():
+                    raise ValueError(f"Invalid row '{row}' in position '{text}'.")
+                c += int(char)
+                continue
+            if c >= BOARD_N or char not in "RB*":
+                raise ValueError(f"Invalid row '{row}' in position '{text}'.")
+            bit = 1 << (r * BOARD_N + c)
+            pads |= bit
+            if char == "R":
+                red |= bit
+            elif char == "B":
+                blue |= bit
+            c += 1
+        if c != BOARD_N:
+            raise ValueError(f"Row '{row}' in position '{text}' is not {BOARD_N} cells wide.")
+
+    try:
+        turn_color = _CODE_COLORS[fields[1]] if len(fields) > 1 else PlayerColor.RED
+        turn = int(fields[2]) if len(fields) > 2 else 0
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid colour or turn in position '{text}'.")
+    if turn < 0:
+        raise ValueError(f"Negative turn in position '{text}'.")
+    return pads, red, blue, turn_color, turn
+
+
+def pack_position(pads: int, red: int, blue: int, turn_color: PlayerColor, turn: int) -> bytes:
+    """
+    Pack a position into PACKED_SIZE bytes: the lily pad mask, the rank of the
+    red frog set among all sets of FROGS_PER_PLAYER cells, the rank of the
+    blue frog set among the cells red leaves free, the colour to move and the
+    turn count, as one little-endian 128-bit integer. Raises ValueError unless
+    each player has FROGS_PER_PLAYER frogs and the turn count fits in 8 bits.
+    """
+    if red.bit_count() != FROGS_PER_PLAYER or blue.bit_count() != FROGS_PER_PLAYER \
+            or red & blue or not 0 <= turn < 1 << _TURN_BITS:
+        raise ValueError(f"Only positions with {FROGS_PER_PLAYER} frogs a side and turn "
+                         f"< {1 << _TURN_BITS} can be packed.")
+    packed = turn_color.value << _TURN_BITS | turn
+    packed = packed << _BLUE_RANK_BITS | _rank(_compress(blue, red))
+    packed = packed << _RED_RANK_BITS | _rank(red)
+    packed = packed << _CELLS | pads
+    return packed.to_bytes(PACKED_SIZE, "little")
+
+
+def unpack_position(data: bytes) -> Position:
+    """
+    Inverse of `pack_position`.
+    """
+    if len(data) != PACKED_SIZE:
+        raise ValueError(f"Packed positions are {PACKED_SIZE} bytes, not {len(data)}.")
+    packed = int.from_bytes(data, "little")
+    pads = packed & ((1 << _CELLS) - 1)
+    packed >>= _CELLS
+    red = _unrank(packed & ((1 << _RED_RANK_BITS) - 1))
+    packed >>= _RED_RANK_BITS
+    blue = _expand(_unrank(packed & ((1 << _BLUE_RANK_BITS) - 1)), red)
+    packed >>= _BLUE_RANK_BITS
+    turn = packed & ((1 << _TURN_BITS) - 1)
+    turn_color = PlayerColor((packed >> _TURN_BITS) & 1)
+    return pads, red, blue, turn_color, turn
+
+
+def _rank(mask: int) -> int:
+    # Colexicographic rank of a FROGS_PER_PLAYER-cell set: sum of C(cell, i + 1)
+    # over its cells in increasing order
+    rank, i = 0, 0
+    while mask:
+        low = mask & -mask
+        i += 1
+        rank += _COMB[low.bit_length() - 1][i]
+        mask ^= low
+    return rank
+
+
+def _unrank(rank: int) -> int:
+    # The FROGS_PER_PLAYER-cell set with a given colexicographic rank
+    mask, cell = 0, _CELLS
+    for i in range(FROGS_PER_PLAYER, 0, -1):
+        cell -= 1
+        while _COMB[cell][i] > rank:
+            cell -= 1
+        rank -= _COMB[cell][i]
+        mask |= 1 << cell
+    return mask
+
+
+def _compress(mask: int, taken: int) -> int:
+    # Renumber the cells of mask by their index among the cells not in taken
+    compressed = 0
+    while mask:
+        low = mask & -mask
+        compressed |= low >> (taken & (low - 1)).bit_count()
+        mask ^= low
+    return compressed
+
+
+def _expand(compressed: int, taken: int) -> int:
+    # Inverse of _compress
+    mask = 0
+    while compressed:
+        low = compressed & -compressed
+        cell = low.bit_length() - 1
+        skip = taken
+        while skip:
+            low_taken = skip & -skip
+            if low_taken.bit_length() - 1 > cell:
+                break
+            cell += 1
+            skip ^= low_taken
+        mask |= 1 << cell
+        compressed ^= low
+    return mask
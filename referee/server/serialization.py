@@ -6,6 +6,7 @@ from typing import Literal
 
 from ..game import *
 from ..game.board import CellState
+from ..game.geometry import CELLS
 
 
 def serialize_game_board(board: Board) -> list[list[int]]:
@@ -15,7 +16,7 @@ def serialize_game_board(board: Board) -> list[list[int]]:
     sz_board = [BOARD_N * [0] for _ in range(BOARD_N)]
     for r in range(BOARD_N):
         for c in range(BOARD_N):
-            sz_board[r][c] = serialize_game_board_cell(board[Coord(r, c)])
+            sz_board[r][c] = serialize_game_board_cell(board[CELLS[r * BOARD_N + c]])
 
     return sz_board
 